@@ -0,0 +1,54 @@
+# conftest.py
+
+from textwrap import dedent, indent
+
+import pytest
+
+import frames_db
+import frames_yaml
+
+
+Versions = r'''
+- user: bruce
+  versions:
+    - add:
+      - name: start
+'''
+
+
+def load_data(conn, s):
+    for type in frames_yaml.load_data(s):
+        if 'versions' in type:
+            frames_yaml.versions.load_yaml(conn, type)
+        else:
+            frames_yaml.frames.load_yaml(conn, type)
+
+
+@pytest.fixture
+def conn(tmp_path):
+    r'''A new frames database with one version, 'start'.
+    '''
+    conn = frames_db.sqlite3_db().connect(str(tmp_path / 'test.db'))
+    with open('frame_schema.sql', 'r') as sql, conn:
+        conn.executescript(sql.read())
+    with conn:
+        load_data(conn, Versions)
+    return conn
+
+
+@pytest.fixture
+def load(conn):
+    r'''Returns a function that loads yaml `frames` into the 'start' version.
+
+    `frames` is the yaml list for one `section` (add, change or delete),
+    each entry starting with "- ".
+    '''
+    def load(frames, section='add'):
+        with conn:
+            load_data(conn, r'''
+- user: bruce
+  selected_version: start
+  frames:
+    - ''' + section + ''':
+''' + indent(dedent(frames), ' ' * 6))
+    return load
@@ -58,13 +58,18 @@ class connection:
     commit at the end of the "with" block.  This will rollback if the "with"
     block exits due to an uncaught exception.  It also captures the current
     system time (UTC) as 'self.now' at the start of the "with" block.
+
+    The outermost "with" block starts its transaction with `begin_sql`.
     '''
+    begin_sql = 'BEGIN'
+
     def __init__(self, db, db_conn, trace=False):
         self.db = db
         self.db_conn = db_conn
         self.trace = trace
         self.default_cursor = self.cursor(self.trace)
         self.trans_attr_names = []  # [set()]
+        self.stmt_cache = {}        # {key: (sql, param_names)}
 
     def reset_cursor(self):
         self.default_cursor.close()
@@ -102,7 +107,7 @@ class connection:
         '''
         self.trans_attr_names.append(set())
         if len(self.trans_attr_names) == 1:
-            self.default_cursor.execute('BEGIN')
+            self.default_cursor.execute(self.begin_sql)
             self.set_trans_attr('now', datetime.utcnow())
         return self
 
@@ -128,6 +133,12 @@ class connection:
     def execute(self, *sql_lines, **params):
         return self.default_cursor.execute(*sql_lines, **params)
 
+    def prepare(self, *sql_lines):
+        return self.default_cursor.prepare(*sql_lines)
+
+    def execute_prepared(self, prepared, **sql_params):
+        return self.default_cursor.execute_prepared(prepared, **sql_params)
+
     def select(self, table_name, columns='*', **where):
         return self.default_cursor.select(table_name, columns, **where)
 
@@ -161,6 +172,9 @@ class connection:
     def fetchone(self):
         return self.default_cursor.fetchone()
 
+    def iter_chunks(self, size=1024):
+        return self.default_cursor.iter_chunks(size)
+
     @property
     def lastrowid(self):
         return self.default_cursor.lastrowid
@@ -190,6 +204,10 @@ class cursor:
     Adds the following helper methods:
 
         _ __enter__/__exit__ to close the cursor
+        - prepare(*sql_lines)
+        - execute_prepared(prepared, **param_values)
+        - prepared_insert(table_name, col_names)
+        - iter_chunks(size=1024)
         - select(table_name, columns='*', **where)
         - select_1(table_name, columns='*', **where)
         - select_1_column(table_name, column, **where)
@@ -210,11 +228,13 @@ class cursor:
         }
     sql_param_re = re.compile(r':([a-zA-Z_][a-zA-Z0-9_]*)')
     sql_param_list_re = re.compile(r'::([a-zA-Z_][a-zA-Z0-9_]*)')
+    sql_any_param_re = re.compile(r'(::?)([a-zA-Z_][a-zA-Z0-9_]*)')
 
     def __init__(self, conn, db_cur, trace=False):
         self.connection = conn
         self.db_cur = db_cur
         self.sql_param, kind = self.paramstyles[self.connection.db.paramstyle]
+        self.param_kind = kind
         self.trace = trace
         if kind == "pos":
             self.execute = self.execute_pos
@@ -224,6 +244,12 @@ class cursor:
     def __iter__(self):
         return iter(self.db_cur)
 
+    def iter_chunks(self, size=1024):
+        r'''Iterates over the rows, fetching `size` rows at a time.
+        '''
+        while rows := self.db_cur.fetchmany(size):
+            yield from rows
+
     def __enter__(self):
         return self
 
@@ -247,9 +273,9 @@ class cursor:
             param_list = new_params.pop(param_name)
             ans = []
             for i, x in enumerate(param_list, 1):
-                x_name = self.sql_param.format(f"param_name_{i}")
+                x_name = f"_{param_name}_{i}"
                 new_params[x_name] = x
-                ans.append(x_name)
+                ans.append(f":{x_name}")
             return ', '.join(ans)
         sql = self.sql_param_list_re.sub(repl_list_fn, sql)
         def repl_fn(match):
@@ -269,10 +295,15 @@ class cursor:
             print()
         param_num = 1
         new_params = []
-        def repl_list_fn(match):
+        # Both kinds of parameters are done in one pass, so that new_params
+        # are in the order that they appear in the sql.
+        def repl_fn(match):
             nonlocal param_num
-            param_name = match.group(1)
-            param_list = sql_params[param_name]
+            colons, param_name = match.groups()
+            if colons == '::':
+                param_list = sql_params[param_name]
+            else:
+                param_list = (sql_params[param_name],)
             ans = []
             for x in param_list:
                 x_name = self.sql_param.format(param_num)
@@ -280,20 +311,65 @@ class cursor:
                 ans.append(x_name)
                 param_num += 1
             return ', '.join(ans)
-        sql = self.sql_param_list_re.sub(repl_list_fn, sql)
+        sql = self.sql_any_param_re.sub(repl_fn, sql)
+        try:
+            self.db_cur.execute(sql, new_params)
+        except self.connection.db.DatabaseError:
+            print("SQL:", sql)
+            raise
+
+    def prepare(self, *sql_lines):
+        r'''Translates the sql parameters in `sql_lines` once, for reuse.
+
+        Returns (sql, param_names), where `sql` uses the sql parameter style of
+        the python database module, and `param_names` are in the order they
+        are used in `sql`.  Pass this to `execute_prepared`.
+
+        Does not support ::name parameters.
+        '''
+        param_names = []
         def repl_fn(match):
-            nonlocal param_num
-            param_name = match.group(1)
-            new_params.append(sql_params[param_name])
-            ans = self.sql_param.format(param_num)
-            param_num += 1
-            return ans
+            param_names.append(match.group(1))
+            if self.param_kind == "pos":
+                return self.sql_param.format(len(param_names))
+            return self.sql_param.format(match.group(1))
+        sql = self.sql_param_re.sub(repl_fn, '\n'.join(sql_lines))
+        return sql, param_names
+
+    def execute_prepared(self, prepared, **sql_params):
+        r'''Executes a `prepared` statement (as returned by `prepare`).
+        '''
+        sql, param_names = prepared
+        if self.trace:
+            print(sql)
+            for name, value in sorted(sql_params.items()):
+                print(f"{name}: {value}")
+            print()
+        if self.param_kind == "pos":
+            params = [sql_params[name] for name in param_names]
+        else:
+            params = sql_params
         try:
-            self.db_cur.execute(self.sql_param_re.sub(repl_fn, sql), new_params)
+            self.db_cur.execute(sql, params)
         except self.connection.db.DatabaseError:
-            print("SQL:", self.sql_param_re.sub(repl_fn, sql))
+            print("SQL:", sql)
             raise
 
+    def prepared_insert(self, table_name, col_names):
+        r'''Returns the prepared INSERT statement for `col_names`.
+
+        These are cached on the connection by table_name and col_names, so the
+        sql is only generated once for each.
+        '''
+        key = ('insert', table_name, col_names)
+        prepared = self.connection.stmt_cache.get(key)
+        if prepared is None:
+            prepared = self.prepare(
+               f"INSERT INTO {table_name} ({', '.join(col_names)})",
+               f"""VALUES ({', '.join(f":{col}" for col in col_names)})""")
+            self.connection.stmt_cache[key] = prepared
+        return prepared
+
     def select(self, table_name, columns='*', **where):
         r'''Use standard cursor commands to fetch rows.
         
@@ -344,12 +420,21 @@ class cursor:
         return value
 
     def exists(self, table_name, **where):
-        return bool(
-                 next(
-                   iter(
-                     self.connection.select_1_column(table_name, "'True'",
-                                                     **where)),
-                   False))
+        r'''Returns True if any rows in table_name match `where`.
+
+        The database stops at the first matching row, and sends back a single
+        row with the answer.
+        '''
+        sql_lines, params = self.where(where, indent=15)
+        self.execute("SELECT EXISTS (SELECT NULL",
+                     f"                FROM {table_name}",
+                     *sql_lines,
+                     "              ) AS found",
+                     **params)
+        found = self.fetchone()['found']
+        if self.trace:
+            print("got", found)
+        return bool(found)
 
     def where(self, exp, indent=0):
         r'''Takes dict of {col_name: value}; returns sql_lines, params.
@@ -379,10 +464,8 @@ class cursor:
         return sql_lines, params
 
     def insert(self, table_name, **values):
-        self.execute(
-               f"INSERT INTO {table_name} ({', '.join(values.keys())})",
-               f"""VALUES ({', '.join(f":{key}" for key in values.keys())})""",
-               **values)
+        self.execute_prepared(self.prepared_insert(table_name, tuple(values)),
+                              **values)
         if self.trace:
             print("new", table_name, "id", self.lastrowid)
 
@@ -415,6 +498,10 @@ class cursor:
                 select_columns.append(f":{col_name}")
                 params[col_name] = value
 
+        if num_rows is None:
+            return self.insert(table_name, **values)
+        if num_rows == 0:
+            return
         col_names = ', '.join(chain(singleton_col_names, multi_value_col_names))
         one_row = ', '.join(f':_{{0}}_{col_num}'
                             for col_num
@@ -424,7 +511,7 @@ class cursor:
                 for row_num in range(1, num_rows + 1)]
         values = ',\n          '.join(rows)
         self.execute(f"INSERT INTO {table_name} ({col_names})",
-                     f"SELECT {', '.join(select_columns)}, *",
+                     f"SELECT {', '.join(select_columns + ['*'])}",
                      f"  FROM (VALUES",
                      f"          {values})",
                      **params)
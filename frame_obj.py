@@ -1,26 +1,33 @@
 # frame_obj.py
 
-from itertools import groupby, chain
+from sys import intern
+from itertools import groupby
 from operator import itemgetter
 from collections import defaultdict, deque, ChainMap
+from weakref import WeakKeyDictionary
 
 from db import connection
 
 
+bool_values = {'true': True, 'false': False}
+
+
 def asbool(x):
     r'''Converts slot value (a python str) to a python bool.
     '''
-    if x.lower() == 'true':
-        return True
-    if x.lower() == 'false':
-        return False
-    raise ValueError(f"{x!r} is not a legal boolean value")
+    try:
+        return bool_values[x.lower()]
+    except KeyError:
+        raise ValueError(f"{x!r} is not a legal boolean value") from None
 
 
 def islist(x):
     r'''True iff `x` is some kind of list.
+
+    Checks the exact type against list_types (defined at the end of this
+    module), so subclasses must be added there.
     '''
-    return isinstance(x, (slot_list, dynamic_slot_list, list, tuple))
+    return type(x) in list_types
 
 
 def aslist(x):
@@ -33,6 +40,31 @@ def aslist(x):
     return [x]
 
 
+def isdeleted(raw_slot):
+    r'''True iff the `raw_slot` (not a slot_list) has a '<DELETED>' value.
+    '''
+    value = raw_slot['value']
+    # Only 9 char values can match, so don't upper() the rest.
+    return len(value) == 9 and value.upper() == '<DELETED>'
+
+
+def midpoint(a, b):
+    r'''Returns a slot_list_order between `a` and `b` (a < b).
+
+    Picks a whole number if there is one between them, so that halving into
+    fractions (which eventually runs out of float precision) only starts
+    once `a` and `b` are adjacent.
+    '''
+    mid = (a + b) // 2
+    if a < mid < b:
+        return mid
+    return (a + b) / 2
+
+
+# Slot names that are never taken from a spliced-in frame.
+not_spliced = frozenset(('frame_name', 'class_name', 'isa', 'ako', 'splice'))
+
+
 class context:
     r'''Only used for context for format values.
 
@@ -40,13 +72,28 @@ class context:
     '''
     def __init__(self, parent):
         self.parent = parent
+        self.found = {}  # {name.lower(): frame}, only filled while frozen
 
     def __getitem__(self, name):
         parent = self.parent
-        if name.lower() == 'frame':
+        name = name.lower()
+        if name == 'frame':
             assert parent is not None
             #print(f"context[{name}] -> {parent}")
             return parent
+        ans = self.found.get(name)
+        if ans is None:
+            ans = self.find(name)
+            if parent.is_frozen():
+                self.found[name] = ans
+        return ans
+
+    def find(self, name):
+        r'''Finds the nearest parent with a class_name of `name`.
+
+        `name` must be lowercase.
+        '''
+        parent = self.parent
         while parent is not None:
             #print(f"context[{name}] checking {parent}")
             try:
@@ -55,13 +102,23 @@ class context:
                 pass
             else:
                 #print(f"context[{name}] got {class_name!r}")
-                if class_name.lower() == name.lower():
+                if class_name.lower() == name:
                     #print(f"context[{name}] -> {parent}")
                     return parent
             parent = getattr(parent, 'parent', None)
         raise KeyError(name)
 
 
+# The required_versions of versions that don't require any.
+no_versions = frozenset()
+
+# {db_conn: {version_ids: (frame_names, parent_links)}}
+#
+# Shared by all of the version objects on the same db_conn.  Cleared for the
+# db_conn by version.forget_cached_info on any change.
+frame_info_cache = WeakKeyDictionary()
+
+
 class version:
     r'''This provides the high-level access to a frames database.
 
@@ -93,9 +150,15 @@ class version:
         - create_slot(frame_id, name, value, slot_list_order=None, description=None)
           Returns a raw_slot (see get_raw_frame for what a "raw_slot" is).
 
+        - create_slots_bulk(frame_id, name, values_with_orders)
+          Returns a list of raw_slots.
+
         - load_frame(slots)
           `slots` is {name: value}.
 
+        - bulk()
+          Context manager to make a set of changes in one transaction.
+
     Updates to the frame are done directly on the frame object.
     '''
     def __init__(self, db_conn, user_id, *version_names):
@@ -106,38 +169,87 @@ class version:
 
         # self.required_versions is the set of all versions (recursively)
         #                           required by self
-        # self.required_map      is {version_id: set of required_version_ids}
+        # self.required_map      is {version_id: frozenset of
+        #                                         required_version_ids}
         #                           for all version_ids in required_versions
+        #                           that require other versions
         self.required_versions, self.required_map = \
           self.get_all_required_versions()
         #print("version", self.required_versions, self.required_map)
 
-        # {frame_name.upper(): frame_id}
-        self.frame_names = {
+        # {version_ids_frozenset: version_ids.issubset(required_versions)}
+        self.subset_cache = {}
+
+        # (frame_names, parent_links), read on first use.  See the
+        # frame_names and parent_links properties.
+        self.frame_info = None
+
+        self.frame_ids = {}    # {frame_id: frame}
+
+        # {(frame_id, name): frame} found by lookup, cleared on any change.
+        self.lookup_cache = {}
+
+    @property
+    def frame_names(self):
+        r'''{frame_name.upper(): frame_id}
+        '''
+        return self.get_frame_info()[0]
+
+    @property
+    def parent_links(self):
+        r'''{frame_id: set(parent_frame_id)}
+        '''
+        return self.get_frame_info()[1]
+
+    def get_frame_info(self):
+        r'''Returns (frame_names, parent_links).
+
+        These are shared with the other version objects for the same
+        version_ids on the db_conn, and only read from the database if none
+        of them have done so yet.
+        '''
+        if self.frame_info is None:
+            conn_cache = frame_info_cache.setdefault(self.db_conn, {})
+            if self.version_ids not in conn_cache:
+                conn_cache[self.version_ids] = self.read_frame_info()
+            self.frame_info = conn_cache[self.version_ids]
+        return self.frame_info
+
+    def read_frame_info(self):
+        r'''Reads the frame_names and parent_links for my versions.
+
+        Returns ({frame_name.upper(): frame_id},
+                 {frame_id: set(parent_frame_id)})
+        '''
+        frame_names = {
           value.upper(): frame_id
           for frame_id, slot_id, value
            in self.select_slot_ids_by_version("name = 'frame_name'")}
-        #print("frame_names", self.frame_names)
+        #print("frame_names", frame_names)
         #print()
 
-        # [(parent_id, child_id)]
-        slots = [(frame_id, (int(value[1:])
-                             if value[1:].isdigit()
-                             else self.frame_names[value[1:].upper()]))
-                 for frame_id, slot_id, value
-                  in self.select_slot_ids_by_version(
-                       "value LIKE '$%' "
-                       "AND name != 'ako' AND name != 'isa'")]
-
-        # {frame_id: set(parent_frame_id)}
-        self.parent_links = {
-          child_id: {parent_id for parent_id, _ in parents}
-          for child_id, parents
-           in groupby(sorted(slots, key=itemgetter(1)), key=itemgetter(1))}
-        #print("parent_links", self.parent_links)
+        parent_links = defaultdict(set)
+        for parent_id, slot_id, value in self.select_slot_ids_by_version(
+                                           "value LIKE '$%' "
+                                           "AND name != 'ako' "
+                                           "AND name != 'isa'"):
+            label = value[1:]
+            child_id = (int(label) if label.isdigit()
+                                   else frame_names[label.upper()])
+            parent_links[child_id].add(parent_id)
+        parent_links = dict(parent_links)
+        #print("parent_links", parent_links)
         #print()
+        return frame_names, parent_links
 
-        self.frame_ids = {}    # {frame_id: frame}
+    def forget_cached_info(self):
+        r'''Drops the info cached from the database.
+
+        Must be called on any change to the database.
+        '''
+        self.lookup_cache.clear()
+        self.frame_info = None
+        frame_info_cache.pop(self.db_conn, None)
 
     def lookup_version_ids(self):
         self.db_conn.execute("""SELECT version_id, name, status
@@ -160,40 +272,40 @@ class version:
     def get_all_required_versions(self, seen=None, depth=0):
         r'''Figures out all of the required version info.
 
-        Returns ({required_version_id}, {version_id: set(required_version_ids)})
+        Returns ({required_version_id},
+                 {version_id: frozenset(required_version_ids)})
         '''
+        # req is all of the version_requires rows reachable from my
+        # version_ids, closure is its transitive closure.
         self.db_conn.execute("""
           WITH RECURSIVE req(ver_id, req_ver_id)
             AS (  SELECT version_id, required_version_id
                     FROM version_requires
                    WHERE version_id in (::version_ids)
-                UNION ALL
-                  SELECT version_id, required_version_id
-                    FROM version_requires
-                         INNER JOIN req
-                   WHERE version_id == req_ver_id
+                UNION
+                  SELECT vr.version_id, vr.required_version_id
+                    FROM req
+                         INNER JOIN version_requires vr
+                           ON vr.version_id = req.req_ver_id
+              ),
+            closure(ver_id, req_ver_id)
+            AS (  SELECT ver_id, req_ver_id FROM req
+                UNION
+                  SELECT closure.ver_id, req.req_ver_id
+                    FROM closure
+                         INNER JOIN req ON req.ver_id = closure.req_ver_id
               )
 
-          SELECT ver_id, req_ver_id FROM req
+          SELECT ver_id, req_ver_id FROM closure
            ORDER BY ver_id;""",
           version_ids=self.version_ids)
-        required_map = {version_id: set(req_ver_id
-                                        for _, req_ver_id
-                                         in required_versions)
+        required_map = {version_id: frozenset(req_ver_id
+                                              for _, req_ver_id
+                                               in required_versions)
                         for version_id, required_versions
                          in groupby(self.db_conn, key=itemgetter(0))}
         #print("required_map", required_map)
 
-        def fill_req(req_versions, remaining_req_versions):
-            for req_ver in remaining_req_versions:
-                if req_ver in required_map:
-                    deeper_req_versions = \
-                      required_map[req_ver].difference(req_versions)
-                    req_versions.update(deeper_req_versions)
-                    fill_req(req_versions, deeper_req_versions)
-        for ver_id, req_versions in required_map.items():
-            fill_req(req_versions, req_versions.copy())
-
         all_required = set(self.version_ids)
         for version_id, req_set in required_map.items():
             all_required.add(version_id)
@@ -216,10 +328,18 @@ class version:
 
         # {base_id: {derived_id}}
         derived_map = defaultdict(set)
-        for (frame_id, name, slot_list_order), raw_slot in raw_frames.items():
+
+        # {name: [((frame_id, name, slot_list_order), raw_slot)]}
+        slots_by_name = defaultdict(list)
+        for key, raw_slot in raw_frames.items():
+            name = key[1]
             if name in ('AKO', 'ISA'):
                 # FIX: what if raw_slot is a slot_list?
-                derived_map[raw_slot['value']].add(frame_id)
+                label = raw_slot['value'][1:]
+                base_id = (int(label) if label.isdigit()
+                                      else self.frame_names[label.upper()])
+                derived_map[base_id].add(key[0])
+            slots_by_name[name].append((key, raw_slot))
 
         def frames_with_slot(slot_name, value):
             r'''Slot_name is passed in uppercase.
@@ -228,25 +348,47 @@ class version:
                 value = frame.frame_id
             if isinstance(value, str):
                 value = value.upper()
-            for (frame_id, name, slot_list_order), slot in raw_frames.items():
-                if name == slot_name and \
-                   value in ((slot['value'].upper()
-                              if isinstance(slot['value'], str)
-                              else slot['value']),
-                             '*'):
+            for (frame_id, name, slot_list_order), slot \
+             in slots_by_name[slot_name]:
+                if value in ((slot['value'].upper()
+                               if isinstance(slot['value'], str)
+                               else slot['value']),
+                              '*'):
                     yield frame_id
                     if slot_name != 'FRAME_NAME':
-                        yield from spew_derived(frame_id, name, slot_list_order)
+                        yield from derived(frame_id, name, slot_list_order)
+
+        # {(frame_id, name, slot_list_order): {derived_id}}
+        derived_cache = {}
 
-        def spew_derived(frame_id, name, slot_list_order):
-            for d in derived_map[frame_id]:
-                if (d, name, slot_list_order) not in slots_found:
-                    yield d
-                    yield from spew_derived(d, name, slot_list_order)
+        def derived(frame_id, name, slot_list_order):
+            r'''Returns all frames derived (recursively) from frame_id that
+            inherit its name[slot_list_order] slot.
 
-        found = [frozenset(frames_with_slot(slot_name.upper(), value))
-                 for slot_name, value in slots.items()]
-        return found[0].intersection(*found[1:])
+            Frames with their own name[slot_list_order] slot are not included,
+            and neither are the frames derived from them.
+            '''
+            key = frame_id, name, slot_list_order
+            if key not in derived_cache:
+                found = set()
+                base_ids = [frame_id]
+                while base_ids:
+                    for d in derived_map.get(base_ids.pop(), ()):
+                        if d not in found and \
+                           (d, name, slot_list_order) not in raw_frames:
+                            found.add(d)
+                            base_ids.append(d)
+                derived_cache[key] = found
+            return derived_cache[key]
+
+        # Intersect as we go, so that we can stop as soon as nothing is left.
+        found = None
+        for slot_name, value in slots.items():
+            frame_ids = frozenset(frames_with_slot(slot_name.upper(), value))
+            found = frame_ids if found is None else found.intersection(frame_ids)
+            if not found:
+                break
+        return found
 
     def get_raw_frame(self, frame_label):
         r'''Reads one frame from the database.
@@ -283,24 +425,21 @@ class version:
 
         Returns {(frame_id, slot_name, slot_list_order): raw_slot}.
         '''
-        matching_slot_ids = [slot_id
-                             for frame_id, slot_id, value 
-                              in self.select_slot_ids_by_version(where_exp,
-                                                                 sql_params)]
-
-        self.db_conn.execute("""SELECT *
-                                  FROM Slot
-                                 WHERE slot_id IN (::slot_ids);""",
-                             slot_ids=matching_slot_ids)
-
-        return {(row['frame_id'], row['name'].upper(), row['slot_list_order']):
-                dict(frame_id=row['frame_id'],
-                     slot_id=row['slot_id'],
-                     name=row['name'],
-                     slot_list_order=row['slot_list_order'],
-                     description=row['description'],
-                     value=row['value'])
-                for row in self.db_conn}
+        # The rows already have all of the Slot columns needed, so there's no
+        # second SELECT on Slot.
+        #
+        # There are only a few different slot names, so the uppercased names
+        # in the keys are interned to share one str for each.
+        return {(frame_id, intern(name.upper()), slot_list_order):
+                dict(frame_id=frame_id,
+                     slot_id=slot_id,
+                     name=name,
+                     slot_list_order=slot_list_order,
+                     description=description,
+                     value=value)
+                for frame_id, name, slot_list_order, slot_id, value, _, _,
+                    description
+                 in self.select_slot_rows_by_version(where_exp, sql_params)}
 
     def select_slot_ids_by_version(self, where_exp, sql_params={}):
         r'''Finds matching slots that are best match to my versions.
@@ -309,13 +448,28 @@ class version:
 
         Returns [(frame_id, slot_id, value)]
         '''
+        return [(row[0], row[3], row[4])
+                for row in self.select_slot_rows_by_version(where_exp,
+                                                            sql_params)]
+
+    def select_slot_rows_by_version(self, where_exp, sql_params={}):
+        r'''Finds matching slots that are best match to my versions.
+
+        Finds slots matching where_exp/sql_params.
+
+        Returns [(frame_id, name, slot_list_order, slot_id, value, desired,
+                  version_id, description)], one row per slot_id.
+        '''
         self.db_conn.execute(f"""
-          WITH desired_slots(frame_id, name, slot_list_order, slot_id, value)
-            AS (SELECT frame_id, name, slot_list_order, slot_id, value
+          WITH desired_slots(frame_id, name, slot_list_order, slot_id, value,
+                             description)
+            AS (SELECT frame_id, name, slot_list_order, slot_id, value,
+                       description
                   FROM Slot
                  WHERE {where_exp})
 
-          SELECT desired_slots.*, 1, version_id
+          SELECT frame_id, name, slot_list_order, slot_id, value, 1,
+                 version_id, description
             FROM desired_slots
                  INNER JOIN Slot_versions USING (slot_id)
 
@@ -323,109 +477,112 @@ class version:
 
           -- Undesired slots that might be a better version match than the
           -- desired ones (and, hence, hide the desired value)!
-          SELECT frame_id, name, slot_list_order, s.slot_id, NULL, 0, version_id
+          SELECT frame_id, name, slot_list_order, s.slot_id, NULL, 0,
+                 version_id, NULL
             FROM desired_slots ds
                  INNER JOIN Slot s USING (frame_id, name, slot_list_order)
                  INNER JOIN Slot_versions v ON v.slot_id = s.slot_id
            WHERE ds.slot_id != s.slot_id;""",
           **sql_params)
 
-        return self.select_best_matches(self.db_conn)
+        return self.select_best_matches(self.db_conn.iter_chunks())
 
     def select_best_matches(self, raw_slot_rows):
         r'''Selects desired slots that are the best match to my versions.
 
         raw_slot_rows is (frame_id, name, slot_list_order, slot_id, value, desired,
-        version_id)
+        version_id, description)
 
-        Returns [(frame_id, slot_id, value)]
+        Returns the first raw_slot_row for each slot_id selected.
         '''
-        sorted_slots = sorted(raw_slot_rows,
-                              key=lambda row: (row[0], row[1].upper(),
-                                               row[2], row[3]))
+        # Only the first row and the version_ids are kept for each slot, not
+        # all of its rows.
+        #
+        # {(frame_id, name.upper(), slot_list_order):
+        #    {(slot_id, value, desired): (first_row, {version_id})}}
+        slot_names = defaultdict(dict)
+        for row in raw_slot_rows:
+            slots = slot_names[row[0], row[1].upper(), row[2]]
+            key = row[3], row[4], row[5]
+            if key in slots:
+                slots[key][1].add(row[6])
+            else:
+                slots[key] = row, {row[6]}
 
-        matching_slot_ids = []
+        best_rows = []
+        subset_cache = self.subset_cache
 
         # for each slot name:
-        for (frame_id, name, slot_list_order), slots \
-         in groupby(sorted_slots,
-                    key=lambda row: (row[0], row[1].upper(), row[2])):
+        for (frame_id, name, slot_list_order), slots in slot_names.items():
 
-            # [(slot_id, value, desired, version_ids_frozenset)]
+            # [(slot_id, value, desired, version_ids_frozenset, first_row)]
             matching_slots = []
 
             # Gather slot_ids that have all of my required_versions.
-            for (slot_id, value, desired), versions \
-             in groupby(slots, key=itemgetter(3, 4, 5)):
-                version_ids = frozenset(v[6] for v in versions)
-                if version_ids.issubset(self.required_versions):
+            for (slot_id, value, desired), (first_row, versions) \
+             in slots.items():
+                version_ids = frozenset(versions)
+                is_subset = subset_cache.get(version_ids)
+                if is_subset is None:
+                    is_subset = version_ids.issubset(self.required_versions)
+                    subset_cache[version_ids] = is_subset
+                if is_subset:
                     matching_slots.append((slot_id, value,
-                                           desired, version_ids))
+                                           desired, version_ids, first_row))
             #print("matching_slots", matching_slots)
 
             # Find best match
             if len(matching_slots) == 1:
                 # Only one slot_id found, it's the best match!
                 if matching_slots[0][2]: # desired
-                    matching_slot_ids.append((frame_id, matching_slots[0][0],
-                                              matching_slots[0][1]))
+                    best_rows.append(matching_slots[0][4])
             elif matching_slots:
-                best_match = None  # (slot_id, versions)
-
-                # Try each slot to see which one is the best match.
-                for slot_id, value, desired, versions in matching_slots:
-                    #print("checking", slot_id, versions)
-
-                    # Look for better match in other slots.
-                    for slot_id2, _, _, versions2 in matching_slots:
-                        if slot_id != slot_id2 and \
-                           not self.better_fit(slot_id, versions,
-                                               slot_id2, versions2):
-                            # nope, slot_id is not the best match!
-                            break
-                    else:
-                        # No better fit, slot_id is the best one!
-                        if best_match is not None:
-                            # Conflict!
-                            # How could this happen??
-                            raise AssertionError(
-                                    "Impossible slot version conflict between "
-                                    f"{matching_slots}")
-                        else:
-                            best_match = (slot_id, value, desired, versions)
+                # The best match is a better_fit than every other slot.
+                # better_fit is antisymmetric, so there can only be one, and
+                # it is the last one standing after this single pass...
+                best_match = matching_slots[0]
+                for slot in matching_slots[1:]:
+                    if self.better_fit(slot[0], slot[3],
+                                       best_match[0], best_match[3]):
+                        best_match = slot
+                #print("checking", best_match[0], best_match[3])
+
+                # ... but it still has to beat all of the others.
+                for slot in matching_slots:
+                    if slot is not best_match and \
+                       not self.better_fit(best_match[0], best_match[3],
+                                           slot[0], slot[3]):
+                        # nope, there is no best match!
+                        best_match = None
+                        break
                 if best_match is not None:
                     # Best match found!
                     if best_match[2]: # desired
-                        matching_slot_ids.append((frame_id, best_match[0],
-                                                  best_match[1]))
+                        best_rows.append(best_match[4])
                 else:
                     # None of the versions stands out as being better than all
                     # of the rest...
                     matches = ', '.join('{}{}'.format(s, list(v))
-                                        for s, _, _, v in matching_slots)
+                                        for s, _, _, v, _ in matching_slots)
                     raise AssertionError(
                             f"Slot version conflict between {matches}")
-        return matching_slot_ids
+        return best_rows
 
     def better_fit(self, slot_id, versions, other_slot_id, other_versions):
         #print("better_fit", versions, other_versions)
         if len(other_versions) > len(versions):
             #print("better_fit -> False, len(other_versions) > len(versions)")
             return False
-        num_better = 0
-        num_matches = 0
-        for v in versions:
-            for other_v in other_versions:
-                #print("checking", v, "against", other_v)
-                if v == other_v:
-                    num_matches += 1
-                elif v in self.required_map and other_v in self.required_map[v]:
-                    # v is better than other_v
-                    num_better += 1
-                elif other_v in self.required_map and \
-                     v in self.required_map[other_v]:
-                    # other_v is better than v
-                    return False
+        required_map = self.required_map
+        for other_v in other_versions:
+            if not versions.isdisjoint(required_map.get(other_v, no_versions)):
+                # other_v is better than some v
+                return False
+        num_matches = len(versions & other_versions)
+
+        # The number of (v, other_v) pairs where v is better than other_v
+        num_better = sum(len(required_map.get(v, no_versions) & other_versions)
+                         for v in versions)
         #print("better_fit: num_better", num_better, "num_matches", num_matches)
         if num_better + num_matches < len(other_versions):
             # There are some disjoint versions between the two sets of versions
@@ -473,21 +630,27 @@ class version:
 
         Raises KeyError if `name` not found.
         '''
-        frame = self.frame_ids[frame_id]
         if name == 'frame':
-            return frame
-        class_name = getattr(frame, 'class_name', None)
-        if class_name is not None and class_name.lower() == name:
-            return frame
+            return self.frame_ids[frame_id]
+        found = self.lookup_cache.get((frame_id, name))
+        if found is not None:
+            return found
 
         # breadth-first search...
-        parents = deque(self.parent_links.get(frame_id, ()))
-        while parents:
-            try:
-                return self.lookup(parents.popleft(), name)
-            except KeyError:
-                parents.extend(self.parent_links.get(frame_id, ()))
-        raise KeyError(f"{name} in {frame.frame_label}")
+        seen = set()
+        frame_ids = deque([frame_id])
+        while frame_ids:
+            next_id = frame_ids.popleft()
+            if next_id in seen:
+                continue
+            seen.add(next_id)
+            frame = self.frame_ids[next_id]
+            class_name = getattr(frame, 'class_name', None)
+            if class_name is not None and class_name.lower() == name:
+                self.lookup_cache[frame_id, name] = frame
+                return frame
+            frame_ids.extend(self.parent_links.get(next_id, ()))
+        raise KeyError(f"{name} in {self.frame_ids[frame_id].frame_label}")
 
     def delete_slot(self, slot_id):
         r'''Marks slot_id as deleted.
@@ -496,20 +659,45 @@ class version:
         '''
         # FIX: Do I need to check the slot's versions before doing this
         #      (vs. creating a new slot)?
+        self.forget_cached_info()
         self.db_conn.execute("""UPDATE Slot
                                    SET value = '<DELETED>'
                                  WHERE slot_id = :slot_id""",
                              slot_id=slot_id)
 
+    def delete_slots(self, slot_ids):
+        r'''Marks all of the `slot_ids` as deleted, with one UPDATE.
+
+        Doesn't return anything.
+        '''
+        slot_ids = list(slot_ids)
+        if slot_ids:
+            self.forget_cached_info()
+            self.db_conn.execute("""UPDATE Slot
+                                       SET value = '<DELETED>'
+                                     WHERE slot_id IN (::slot_ids)""",
+                                 slot_ids=slot_ids)
+
+    def bulk(self):
+        r'''Returns a context manager that does all of the changes made within
+        it in one transaction.
+
+        This is the db_conn's "with" block, so nests within other "with"
+        blocks on the db_conn.
+        '''
+        return self.db_conn
+
     def create_list(self, frame, name, values):
         r'''Creates a new set of slots, numbering slot_list_order from 1000 by 1.
 
         Returns a slot_list of the newly created values.
         '''
-        raw_slots = []
-        for slot_list_order, value in enumerate(values, 1000):
-            raw_slots.append(self.create_slot(frame.frame_id, name, value,
-                                              slot_list_order))
+        with self.bulk():
+            raw_slots = self.create_slots_bulk(
+                          frame.frame_id, name,
+                          [(slot_list_order, value, None)
+                           for slot_list_order, value
+                            in enumerate(values, 1000)])
         return slot_list(frame, name, raw_slots)
 
     def update_slot(self, slot_id, value, slot_list_order=None, description=None):
@@ -517,11 +705,18 @@ class version:
         '''
         if self.frozen:
             raise AssertionError("Can not make changes to frozen versions")
-
-        self.db_conn.execute("""SELECT version_id FROM Slot_versions
-                                 WHERE slot_id = :slot_id""",
+        self.forget_cached_info()
+
+        # One SELECT for both the slot's versions, and the frame_id and name
+        # needed if a new slot has to be created.
+        self.db_conn.execute("""SELECT s.frame_id, s.name, sv.version_id
+                                  FROM Slot s
+                                       LEFT JOIN Slot_versions sv
+                                         ON sv.slot_id = s.slot_id
+                                 WHERE s.slot_id = :slot_id""",
                              slot_id=slot_id)
-        slot_versions = frozenset(row[0] for row in self.db_conn)
+        rows = self.db_conn.fetchall()
+        slot_versions = frozenset(row[2] for row in rows if row[2] is not None)
         if slot_versions == self.version_ids:
             # Current slot_id is for this version!  Update slot in place...
             if isinstance(value, frame):
@@ -540,11 +735,7 @@ class version:
             return slot_id
 
         # Otherwise, create new slot for this version...
-        self.db_conn.execute("""SELECT frame_id, name
-                                  FROM Slot
-                                 WHERE slot_id = :slot_id""",
-                             slot_id=slot_id)
-        frame_id, name = self.db_conn.fetchone()
+        frame_id, name = rows[0][0], rows[0][1]
         raw_slot = self.create_slot(frame_id, name, slot_list_order, value,
                                     description)
         return raw_slot['slot_id']
@@ -555,30 +746,37 @@ class version:
         '''
         if self.frozen:
             raise AssertionError("Can not make changes to frozen versions")
+        self.forget_cached_info()
         if isinstance(value, frame):
             db_value = f"${value.frame_label}"
         else:
             db_value = str(value)
-        # Insert the new slot row
-        self.db_conn.execute("""
-          INSERT INTO Slot (frame_id, name, slot_list_order, value, description,
-                            creation_user_id, creation_timestamp)
-          VALUES (:frame_id, :name, :slot_list_order, :value, :description,
-                  :creation_user_id, datetime("now"));""",
-          frame_id=frame_id, name=name, slot_list_order=slot_list_order, value=db_value,
-          description=description, creation_user_id=self.user_id)
-        slot_id = self.db_conn.lastrowid
-
-        # Assign version_ids to new slot
-        for version_id in self.version_ids:
+        with self.bulk():
+            # Both rows get the db_conn's timestamp for this "with" block.
+            now = self.db_conn.now
+
+            # Insert the new slot row
+            self.db_conn.execute("""
+              INSERT INTO Slot (frame_id, name, slot_list_order, value,
+                                description, creation_user_id,
+                                creation_timestamp)
+              VALUES (:frame_id, :name, :slot_list_order, :value,
+                      :description, :creation_user_id, :now);""",
+              frame_id=frame_id, name=name, slot_list_order=slot_list_order,
+              value=db_value, description=description,
+              creation_user_id=self.user_id, now=now)
+            slot_id = self.db_conn.lastrowid
+
+            # Assign version_ids to new slot, all in one INSERT
             self.db_conn.execute("""
               INSERT INTO Slot_versions (slot_id, version_id,
                                          creation_user_id, creation_timestamp)
-              VALUES (:slot_id, :version_id,
-                      :creation_user_id, datetime("now"));
+              SELECT :slot_id, version_id, :creation_user_id, :now
+                FROM Version
+               WHERE version_id IN (::version_ids);
               """,
-              slot_id=slot_id, version_id=version_id,
-              creation_user_id=self.user_id)
+              slot_id=slot_id, version_ids=self.version_ids,
+              creation_user_id=self.user_id, now=now)
 
         return dict(frame_id=frame_id,
                     slot_id=slot_id,
@@ -587,6 +785,56 @@ class version:
                     description=description,
                     value=value)
 
+    def create_slots_bulk(self, frame_id, name, values_with_orders):
+        r'''Creates a slot for each (slot_list_order, value, description) in
+        `values_with_orders`.
+
+        This is one INSERT into Slot, and one into Slot_versions, for all of
+        the values.  Must be called within the db_conn's "with" block.
+
+        Returns a list of raw_slots (see get_raw_frame for what a "raw_slot"
+        is).
+        '''
+        if self.frozen:
+            raise AssertionError("Can not make changes to frozen versions")
+        self.forget_cached_info()
+        if not values_with_orders:
+            return []
+        slot_list_orders, values, descriptions = zip(*values_with_orders)
+        self.db_conn.insert_many("Slot",
+          frame_id=frame_id, name=name, slot_list_order=slot_list_orders,
+          value=[f"${value.frame_label}" if isinstance(value, frame)
+                                         else str(value)
+                 for value in values],
+          description=descriptions,
+          creation_user_id=self.user_id,
+          creation_timestamp=self.db_conn.now)
+
+        # The slot_ids of the rows from one INSERT are consecutive.
+        last_slot_id = self.db_conn.lastrowid
+        first_slot_id = last_slot_id - len(values) + 1
+
+        self.db_conn.execute("""
+          INSERT INTO Slot_versions (slot_id, version_id,
+                                     creation_user_id, creation_timestamp)
+          SELECT s.slot_id, v.version_id, :creation_user_id, :now
+            FROM Slot s, Version v
+           WHERE s.slot_id BETWEEN :first_slot_id AND :last_slot_id
+             AND v.version_id IN (::version_ids);
+          """,
+          first_slot_id=first_slot_id, last_slot_id=last_slot_id,
+          version_ids=self.version_ids, creation_user_id=self.user_id,
+          now=self.db_conn.now)
+
+        return [dict(frame_id=frame_id,
+                     slot_id=slot_id,
+                     name=name,
+                     slot_list_order=slot_list_order,
+                     description=description,
+                     value=value)
+                for slot_id, (slot_list_order, value, description)
+                 in enumerate(values_with_orders, first_slot_id)]
+
     def load_frame(self, slots, last_frame_id=None):
         r'''Creates a new frame with the slots specified.
 
@@ -598,22 +846,19 @@ class version:
         Only called by load_yaml -> load_frames.
 
         Returns frame_id, frame_label ("$<frame_id>" or "$<frame_name>") for
-        the new frame.
+        the new frame, and the last frame_id used by it and all of its nested
+        frames.
         '''
 
         # Figure out frame_id for new frame...
-        self.db_conn.execute("""SELECT frame_id FROM Slot
-                                 ORDER BY frame_id DESC
-                                 LIMIT 1""")
-        rows = self.db_conn.fetchall()
-        if rows:
-            assert len(rows) == 1
-            if last_frame_id is None:
-                frame_id = rows[0][0] + 1
-            else:
-                frame_id = max(rows[0][0], last_frame_id) + 1
-        else:
-            frame_id = 1
+        if last_frame_id is None:
+            # Only the first frame in a load has to ask the database, nested
+            # frames are passed the last_frame_id used so far (which includes
+            # the frames nested within earlier nested frames).
+            self.db_conn.execute("""SELECT COALESCE(MAX(frame_id), 0)
+                                      FROM Slot""")
+            last_frame_id = self.db_conn.fetchone()[0]
+        frame_id = last_frame_id + 1
 
         last_frame_id = frame_id
 
@@ -680,8 +925,8 @@ class version:
                         "slot_list_order not allowed on single-valued "
                         f"slot {slot_name}")
             if isinstance(value, dict):   # nested frame
-                last_frame_id, value = version_obj.load_frame(value,
-                                                              last_frame_id)
+                _, value, last_frame_id = version_obj.load_frame(value,
+                                                                 last_frame_id)
             if new_offset is not None:
                 return (slot_name, version_obj, new_offset - i, value,
                         description)
@@ -689,35 +934,45 @@ class version:
                     description)
 
         frame_label = f"${frame_id}"
-        for name, value in slots.items():
-            #print("create_frame", name, value)
-            slot_name, version_obj, _, value, description = \
-              unwrap_value_info(name, value)
-            if not islist(value):
-                if slot_name.upper() == 'FRAME_NAME':
-                    frame_label = f"${value}"
-                version_obj.create_slot(frame_id, slot_name, value,
-                                        description=description)
-            else:
-                if slot_name.upper() in ("NAME", "AKO", "ISA", "FRAME_NAME",
-                                         "CLASS_NAME", "SPLICE"):
-                    raise AssertionError(
-                            f"{slot_name} slot not allowed to have "
-                            "multiple values")
-                slot_list_order_offset = 1000
-                for i, v in enumerate(value):
-                    new_name, this_version_obj, slot_list_order_offset, v, \
-                    description = \
-                      unwrap_value_info(slot_name, v, version_obj, i,
-                                        slot_list_order_offset)
-                    if new_name != slot_name:
+        # All of the slots, including those in nested frames, in one
+        # transaction.
+        with self.bulk():
+            for name, value in slots.items():
+                #print("create_frame", name, value)
+                slot_name, version_obj, _, value, description = \
+                  unwrap_value_info(name, value)
+                if not islist(value):
+                    if slot_name.upper() == 'FRAME_NAME':
+                        frame_label = f"${value}"
+                    version_obj.create_slot(frame_id, slot_name, value,
+                                            description=description)
+                else:
+                    if slot_name.upper() in ("NAME", "AKO", "ISA",
+                                             "FRAME_NAME", "CLASS_NAME",
+                                             "SPLICE"):
                         raise AssertionError(
-                                "Not allowed to change slot name in "
-                                f"multi-valued slot {name}")
-                    this_version_obj.create_slot(frame_id, slot_name,
-                                                 v, i + slot_list_order_offset,
-                                                 description)
-        return frame_id, frame_label
+                                f"{slot_name} slot not allowed to have "
+                                "multiple values")
+                    slot_list_order_offset = 1000
+
+                    # {version_obj: [(slot_list_order, value, description)]}
+                    bulk_slots = defaultdict(list)
+                    for i, v in enumerate(value):
+                        new_name, this_version_obj, \
+                        slot_list_order_offset, v, description = \
+                          unwrap_value_info(slot_name, v, version_obj, i,
+                                            slot_list_order_offset)
+                        if new_name != slot_name:
+                            raise AssertionError(
+                                    "Not allowed to change slot name in "
+                                    f"multi-valued slot {name}")
+                        bulk_slots[this_version_obj].append(
+                          (i + slot_list_order_offset, v, description))
+                    for this_version_obj, values_with_orders \
+                     in bulk_slots.items():
+                        this_version_obj.create_slots_bulk(frame_id, slot_name,
+                                                           values_with_orders)
+        return frame_id, frame_label, last_frame_id
 
 
 class frame:
@@ -741,6 +996,17 @@ class frame:
         self.parent = parent
         self.splices = splices
 
+        # These are only filled in while the version is frozen (so raw_slots,
+        # and the frames inherited from, can't change):
+        self.slot_names_cache = {}  # {(seen_isa, seen_ako): frozenset}
+        self.inherited_cache = {}   # {(name, try_isa): raw_slot or exc}
+        self.attr_cache = {}        # {attr_name: raw_slot}
+        self.sorted_slot_names = None  # tuple, see get_sorted_slot_names
+        self.frame_label_cache = None  # see frame_label
+
+        self.format_context = None  # context(self), made on first use
+        self.formatted_cache = {}   # {value: value.format_map(context)}
+
     @classmethod
     def from_raw_data(cls, version_obj, frame_id, raw_data):
         r'''Creates new frame from a list of Frame_slot rows.
@@ -760,16 +1026,20 @@ class frame:
                             f"slot_id {first_slot['slot_id']}, "
                             f"next_slot {next_slot['slot_id']}")
                 return first_slot
-            return slot_list(new_frame, name, chain([first_slot],
-                                                    slots_by_name))
+            return slot_list(new_frame, name, [first_slot, *slots_by_name])
         for name, slots_by_name in groupby(raw_data, key=itemgetter('name')):
-            raw_slots[name.lower()] = make_value(slots_by_name)
+            raw_slots[intern(name.lower())] = make_value(slots_by_name)
         return new_frame
 
     @property
     def frame_label(self):
-        return self.version_obj.lookup_frame_name(self.frame_id) \
-            or self.frame_id
+        if self.frame_label_cache is not None:
+            return self.frame_label_cache
+        ans = self.version_obj.lookup_frame_name(self.frame_id) \
+              or self.frame_id
+        if self.is_frozen():
+            self.frame_label_cache = ans
+        return ans
 
     def __repr__(self):
         #if hasattr(self, 'name'):
@@ -784,11 +1054,11 @@ class frame:
         return f"<{self.__class__.__name__}({self.frame_label})>"
 
     def print(self):
-        for name in sorted(self.get_slot_names()):
+        for name in self.get_sorted_slot_names():
             print(name, getattr(self, name))
 
     def dump(self, indent=0):
-        for name in sorted(self.get_slot_names()):
+        for name in self.get_sorted_slot_names():
             value = self.get_slot(name, ignore_format_errors=True)
             print(' ' * indent, end='')
             if isinstance(value, frame) and name.lower() not in ('ako', 'isa'):
@@ -825,22 +1095,46 @@ class frame:
 
         The returned names have been lowercased.
         '''
+        key = seen_isa, seen_ako
+        if key in self.slot_names_cache:
+            return set(self.slot_names_cache[key])
+        ans = self.read_slot_names(seen_isa, seen_ako)
+        if self.is_frozen():
+            self.slot_names_cache[key] = frozenset(ans)
+        return ans
+
+    def get_sorted_slot_names(self):
+        r'''Returns `get_slot_names()` as a sorted tuple.
+        '''
+        if self.sorted_slot_names is not None:
+            return self.sorted_slot_names
+        ans = tuple(sorted(self.get_slot_names()))
+        if self.is_frozen():
+            self.sorted_slot_names = ans
+        return ans
+
+    def read_slot_names(self, seen_isa, seen_ako):
+        r'''Does the work for `get_slot_names`, without the cache.
+        '''
         # Get inherited 'AKO' slots:
-        if 'ako' in self.raw_slots:
-            ans = self.cook_raw_slot(self.get_raw_slot('ako')) \
+        ako = self.get_link('ako')
+        if ako is not None:
+            ans = self.cook_raw_slot(ako) \
                       .get_slot_names(seen_isa=seen_isa, seen_ako=True)
         else:
             ans = set()
 
         # Get inherited 'ISA' slots: (these override inherited 'AKO' slots)
-        if not seen_isa and 'isa' in self.raw_slots:
-            ans.update(self.cook_raw_slot(self.get_raw_slot('isa'))
-                           .get_slot_names(seen_isa=True, seen_ako=seen_ako))
+        if not seen_isa:
+            isa = self.get_link('isa')
+            if isa is not None:
+                ans.update(self.cook_raw_slot(isa)
+                               .get_slot_names(seen_isa=True,
+                                               seen_ako=seen_ako))
 
         # Add my slots: (these override inherited slots)
         for slot_name, slot in self.raw_slots.items():
-            if not isinstance(slot, slot_list) and \
-               slot['value'].upper() == '<DELETED>':
+            if not isinstance(slot, slot_list) and isdeleted(slot):
                 ans.discard(slot_name)
             else:
                 # Don't include 'FRAME_NAME' in inherited slots!
@@ -849,19 +1143,27 @@ class frame:
                 if not skip1 and not skip2:
                     ans.add(slot_name)
         # Add spliced-in slots: (these override everything else!)
+        raw_slots = self.raw_slots.items()
         for slot_list_name, frame in self.splices:
-            for name, raw_slot in self.raw_slots.items():
-                if name not in ('frame_name', 'class_name', 'isa', 'ako',
-                                'splice', slot_list_name):
+            skip = not_spliced | {slot_list_name}
+            for name, raw_slot in raw_slots:
+                if name not in skip:
                     if not isinstance(raw_slot, slot_list) and \
-                       raw_slot['value'].upper() == '<DELETED>':
+                       isdeleted(raw_slot):
                         ans.discard(name)
                     else:
                         ans.add(name)
         return ans
 
     def __getattr__(self, slot_name):
-        return self.get_slot(slot_name)
+        # Same as get_slot, but remembers the raw_slot under the attribute
+        # name as given, so the next access is one dict lookup.
+        raw_slot = self.attr_cache.get(slot_name)
+        if raw_slot is None:
+            raw_slot = self.get_raw_slot_inherited(slot_name)
+            if self.is_frozen():
+                self.attr_cache[slot_name] = raw_slot
+        return self.cook_raw_slot(raw_slot)
 
     def get_slot(self, slot_name, ignore_format_errors=False):
         r'''`slot_name` can be any case (upper/lower).
@@ -876,37 +1178,105 @@ class frame:
 
         Raises AttributeError if not found.
         '''
+        key = slot_name.lower(), try_isa
+        ans = self.inherited_cache.get(key)
+        if ans is None:
+            try:
+                ans = self.find_raw_slot_inherited(slot_name, try_isa)
+            except AttributeError as e:
+                ans = e
+            if self.is_frozen():
+                self.inherited_cache[key] = ans
+        if isinstance(ans, AttributeError):
+            raise ans.with_traceback(None)
+        return ans
+
+    def find_raw_slot_inherited(self, slot_name, try_isa):
+        r'''Does the work for `get_raw_slot_inherited`, without the cache.
+
+        Walks the inherited frames depth first ('AKO' before 'ISA') with a
+        stack of links still to follow, rather than recursing.
+        '''
         #print(f"{self.frame_id}.get_raw_slot_inherited({slot_name}, "
-	#      f"{try_isa})")
+        #      f"{try_isa})")
+
+        name = slot_name.lower()
+        if name == 'frame_name':
+            # Never inherited.
+            return self.check_deleted(
+                     self.get_raw_slot(slot_name, deleted_is_error=False),
+                     slot_name)
+
+        # [(frame, link_name, try_isa, live, path)], popped from the end.
+        # `live` is shared by the links of one frame, and is cleared if that
+        # frame's subtree is abandoned.  `path` is the frozenset of frame_ids
+        # from self down to that frame, to catch inheritance loops.
+        links = []
+
+        def push_links(f, try_isa, path):
+            if name != 'ako' or try_isa:
+                live = [True]
+                if try_isa and 'isa' in f.raw_slots:
+                    links.append((f, 'isa', False, live, path))
+                if 'ako' in f.raw_slots:
+                    links.append((f, 'ako', try_isa, live, path))
 
         try:
             # Check my slots:
             raw_slot = self.get_raw_slot(slot_name, deleted_is_error=False)
-        except AttributeError:
-            if slot_name.lower() != 'frame_name' and \
-               (slot_name.lower() != 'ako' or try_isa):
-
-                # Check inherited 'AKO' slots
-                if 'ako' in self.raw_slots:
-                    ako = self.cook_raw_slot(self.get_raw_slot('ako'),
-                                             format_ok=False)
-                    try:
-                        return ako.get_raw_slot_inherited(slot_name, try_isa)
-                    except AttributeError:
-                        pass
+        except AttributeError as e:
+            push_links(self, try_isa, frozenset((self.frame_id,)))
+            not_found = e
+        else:
+            return self.check_deleted(raw_slot, slot_name)
 
-                # Check inherited 'ISA' slots
-                if try_isa and 'isa' in self.raw_slots:
-                    isa = self.cook_raw_slot(self.get_raw_slot('isa'),
-                                             format_ok=False)
-                    try:
-                        return isa.get_raw_slot_inherited(slot_name,
-                                                          try_isa=False)
-                    except AttributeError:
-                        pass
-            raise
-        if not isinstance(raw_slot, slot_list) and \
-           raw_slot['value'].upper() == '<DELETED>':
+        while links:
+            f, link_name, f_try_isa, live, path = links.pop()
+            if not live[0]:
+                continue
+            try:
+                daddy = f.cook_raw_slot(f.get_link(link_name),
+                                        format_ok=False)
+            except AttributeError:
+                if f is self:
+                    raise
+                live[0] = False
+                continue
+            if not isinstance(daddy, frame):
+                continue
+            if daddy.frame_id in path:
+                raise AssertionError(
+                        f"Inheritance loop through frame_id {daddy.frame_id}")
+            try:
+                raw_slot = daddy.get_raw_slot(slot_name,
+                                              deleted_is_error=False)
+            except AttributeError:
+                push_links(daddy, f_try_isa, path | {daddy.frame_id})
+            else:
+                if isinstance(raw_slot, slot_list) or not isdeleted(raw_slot):
+                    return raw_slot
+        raise not_found
+
+    def get_link(self, link_name):
+        r'''Returns the raw_slot for `link_name` ('ako' or 'isa'), or None.
+
+        Like `get_raw_slot`, but goes straight to raw_slots, since these are
+        never spliced in.
+
+        Raises AttributeError if the link is '<DELETED>'.
+        '''
+        raw_slot = self.raw_slots.get(link_name)
+        if raw_slot is not None and not isinstance(raw_slot, slot_list) \
+           and isdeleted(raw_slot):
+            raise AttributeError(f"{self.frame_label}.{link_name}")
+        return raw_slot
+
+    def check_deleted(self, raw_slot, slot_name):
+        r'''Returns `raw_slot`, unless it's '<DELETED>'.
+
+        Raises AttributeError if it is '<DELETED>'.
+        '''
+        if not isinstance(raw_slot, slot_list) and isdeleted(raw_slot):
             raise AttributeError(f"{self.frame_label}.{slot_name} deleted")
         return raw_slot
 
@@ -943,7 +1313,7 @@ class frame:
                         ans.clear()  # deletes all prior inherited values...
                     else:
                         for daddy_slot in daddy_list.iter_raw_slots():
-                            if daddy_slot['value'].upper() == '<DELETED>':
+                            if isdeleted(daddy_slot):
                                 if daddy_slot['slot_list_order'] in ans:
                                     del ans[daddy_slot['slot_list_order']]
                             else:
@@ -965,10 +1335,10 @@ class frame:
         #print(f"{self.frame_id}.get_raw_slot({slot_name})")
 
         # Check spliced-in slots:
-        if slot_name.lower() not in ('frame_name', 'class_name', 'isa', 'ako',
-                                     'splice'):
+        name = slot_name.lower()
+        if name not in not_spliced:
             for slot_list_name, frame in self.splices:
-                if slot_name.lower() != slot_list_name.lower():
+                if name != slot_list_name.lower():
                     try:
                         return frame.get_my_raw_slot(slot_name)
                     except AttributeError:
@@ -987,15 +1357,13 @@ class frame:
         Raises AttributeError if not found.
         '''
         # Check my slots:
-        try:
-            ans = self.raw_slots[slot_name.lower()]
-        except KeyError:
-            pass
-        else:
+        name = slot_name.lower()
+        ans = self.raw_slots.get(name)
+        if ans is not None:
             if not deleted_is_error or isinstance(ans, slot_list) \
-               or ans['value'].upper() != '<DELETED>':
+               or not isdeleted(ans):
                 return ans
-        if slot_name.lower() != 'frame_name':
+        if name != 'frame_name':
             raise AttributeError(f"{self.frame_label}.{slot_name}")
         else:
             raise AttributeError(f"{self.frame_id}.{slot_name}")
@@ -1016,15 +1384,20 @@ class frame:
         if isinstance(raw_slot, slot_list):
             return raw_slot.prepared()
         value = raw_slot['value']
-        if value[0] == "`":
+        tag = value[0]
+        if tag == "`":
             return value[1:]
-        if value[0] == "$":
+        if tag == "$":
             f = self.version_obj.get_frame(value[1:])
             return f.add_context(self, raw_slot.get('splices', ()))
         if format_ok and '{' in value:
             #print("cook formatting", value)
+            if value in self.formatted_cache:
+                return self.formatted_cache[value]
+            if self.format_context is None:
+                self.format_context = context(self)
             try:
-                ans = value.format_map(context(self))
+                ans = value.format_map(self.format_context)
             except (AttributeError, KeyError):
                 if ignore_format_errors:
                     return value
@@ -1032,6 +1405,8 @@ class frame:
             #print("cook got", repr(ans))
             #print(f"*********** {self.frame_label}.{raw_slot['name']} cooked",
             #      value, "is", ans)
+            if self.is_frozen():
+                self.formatted_cache[value] = ans
             return ans
         return value
 
@@ -1133,10 +1508,13 @@ class slot_list:
     '''
     def __init__(self, frame, name, raw_slots):
         r'''raw_slots must be sorted by slot_list_order.
+
+        A list passed as raw_slots is kept (not copied).
         '''
         self.frame = frame
         self.name = name
-        self.raw_slots = list(raw_slots)
+        self.raw_slots = raw_slots if isinstance(raw_slots, list) \
+                                   else list(raw_slots)
 
     def __repr__(self):
         return f"<slot_list: {self.frame.frame_label}.{self.name}>"
@@ -1144,6 +1522,10 @@ class slot_list:
     def iter_raw_slots(self):
         return iter(self.raw_slots)
 
+    def delete_list(self):
+        self.frame.version_obj.delete_slots(
+          raw_slot['slot_id'] for raw_slot in self.raw_slots)
+
     def prepared(self):
         return dynamic_slot_list(self.frame, self.name, self.raw_slots)
 
@@ -1168,6 +1550,7 @@ class dynamic_slot_list:
     def __init__(self, frame, name, raw_slots):
         #print("dynamic_slot_list", frame.frame_label, name)
         self.frame = frame
+        self.version_obj = frame.version_obj
         self.name = name
         self.raw_slots = list(raw_slots)
         self.prepare()
@@ -1175,7 +1558,8 @@ class dynamic_slot_list:
         #print("dynamic_slot_list", self.raw_slots)
 
     def __str__(self):
-        return f"[{', '.join(str(v['value']) for v in self.raw_slots)}]"
+        values = map(str, map(itemgetter('value'), self.raw_slots))
+        return f"[{', '.join(values)}]"
 
     def __getitem__(self, i):
         return self.frame.cook_raw_slot(self.raw_slots[i])
@@ -1183,10 +1567,6 @@ class dynamic_slot_list:
     def __len__(self):
         return len(self.raw_slots)
 
-    @property
-    def version_obj(self):
-        return self.frame.version_obj
-
     def iter_raw_slots(self):
         return iter(self.raw_slots)
 
@@ -1221,7 +1601,7 @@ class dynamic_slot_list:
         while i < len(self.raw_slots):
             value = self.raw_slots[i]['value']
             if value[0] == '$':
-                value = self.frame.version_obj.get_frame(value[1:])
+                value = self.version_obj.get_frame(value[1:])
             #print("checking index", i, "got", value)
             if isinstance(value, frame) and \
                asbool(getattr(value, 'splice', 'false')):
@@ -1257,10 +1637,12 @@ class dynamic_slot_list:
         self.raw_slots[i:i+1] = new_raw_slots
 
     def delete_list(self):
+        slot_ids = []
         for raw_slot in self.iter_raw_slots():
             assert not isinstance(raw_slot, slot_list), \
                    f"Found slot_list as element in slot_list"
-            self.version_obj.delete_slot(raw_slot['slot_id'])
+            slot_ids.append(raw_slot['slot_id'])
+        self.version_obj.delete_slots(slot_ids)
 
     def insert(self, value, i=None, description=None):
         r'''Inserts a new value at `i`.
@@ -1273,8 +1655,9 @@ class dynamic_slot_list:
         elif i == 0:
             slot_list_order = self.get_raw_slot(0)['slot_list_order'] - 1
         else:
-            slot_list_order = (self.get_raw_slot(i - 1)['slot_list_order']
-                           + self.get_raw_slot(i)['slot_list_order']) / 2
+            slot_list_order = midpoint(
+                                self.get_raw_slot(i - 1)['slot_list_order'],
+                                self.get_raw_slot(i)['slot_list_order'])
         raw_slot = self.version_obj.create_slot(self.frame.frame_id, self.name,
                                                 value, slot_list_order, description)
         self.raw_slots.insert(i, raw_slot)
@@ -1293,6 +1676,9 @@ class dynamic_slot_list:
 
 
 
+list_types = frozenset((slot_list, dynamic_slot_list, list, tuple))
+
+
 if __name__ == "__main__":
     import sys
     sys.setrecursionlimit(100)
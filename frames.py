@@ -1,24 +1,51 @@
 # frames.py
 
-from itertools import groupby
 from operator import itemgetter
+from itertools import chain, pairwise
+from collections import defaultdict
+from heapq import merge
 
+from db import isiter
 from frame_obj import islist
 
 
+# Slot names that can't be loaded as slots (lowercase).
+reserved_slot_names = frozenset(('frame_name',))
+
+# Sort key for Frame_slots rows.  sorted calls this once per row, so
+# there's nothing to gain from decorating the rows by hand.
+slo_key = itemgetter('slot_list_order')
+
+
 def lookup_frame_id(conn, frame_name):
     if frame_name is None:
         raise ValueError(f"Frame_name must not be None")
     return conn.select_1_value('Frame', 'frame_id', name=frame_name)
 
 
+def lookup_frame_ids(conn, frame_names):
+    r'''Returns {frame_name.lower(): frame_id} for all `frame_names` found.
+
+    Does one SELECT for all of the names.  Names not found are left out.
+    '''
+    frame_names = list(frame_names)
+    if not frame_names:
+        return {}
+    conn.select('Frame', 'frame_id, name', name=frame_names)
+    return {row['name'].lower(): row['frame_id'] for row in conn}
+
+
 def get_selected_slots(version_obj, frame_id, slot, slot_list_order='all',
                        version_id=None, exc_on_ambiguity=True):
     r'''Gets all selected slots with `slot` for `frame_id`.
 
+    `frame_id` may also be an iterable of frame_ids.
+
     Returns Frame_slots rows, one per slot_id.
 
-    These are ordered by slot_name, slot_list_order.
+    These are ordered by slot_name (case insensitive), slot_list_order (by
+    frame_id first, when `frame_id` is an iterable).  The SQL does the
+    ordering.
 
     All slots for `frame_id` are returned if `slot` is None.
 
@@ -31,30 +58,170 @@ def get_selected_slots(version_obj, frame_id, slot, slot_list_order='all',
 
     Returns one "<DELETED>" version per slot_id (rather than nothing).  This
     is the version with the greatest version_id.
+
+    The SQL picks the version for each slot_id (see Best_slots_sql), so this
+    only has to check for ambiguities.
     '''
-    selected_slots(version_obj, frame_id, slot, slot_list_order, version_id)
-    ans = []
-    for slot_id, rows in groupby(version_obj, key=itemgetter('slot_id')):
-        list_rows = list(rows)
-        if len(list_rows) == 1:
-            ans.append(list_rows[0])
-        elif list_rows:
-            sorted_rows = sorted((r for r in list_rows
-                                    if r['value'] != '<DELETED>'),
-                                 key=itemgetter('version_id'))
-            if len(sorted_rows) > 1 and exc_on_ambiguity:
+    key, params = selected_slots_params(version_obj, frame_id, slot,
+                                        slot_list_order, version_id)
+    execute_slots_sql(version_obj, ('best_slots',) + key, Best_slots_sql[key],
+                      params)
+    ans = version_obj.fetchall()
+    if exc_on_ambiguity:
+        for row in ans:
+            if row['live_count'] > 1:
+                # Re-read the slot_id's versions for the error message.
+                selected_slots(version_obj, row['frame_id'], row['slot_id'],
+                               version_id=version_id)
+                version_ids = tuple(sorted(r['version_id']
+                                           for r in version_obj
+                                           if r['value'] != '<DELETED>'))
                 raise AssertionError(
                         f"Ambiguious versions for "
-                        f"frame_id {frame_id}, slot_id {slot_id}: "
-                        f"{tuple(r['version_id'] for r in sorted_rows)}")
-            if sorted_rows:
-                ans.append(sorted_rows[0])
-            else:
-                ans.append(sorted(list_rows,
-                                  key=itemgetter('version_id'),
-                                  reverse=True)
-                             [0])
-    return sorted(ans, key=itemgetter('name', 'slot_list_order'))
+                        f"frame_id {frame_id}, slot_id {row['slot_id']}: "
+                        f"{version_ids}")
+    return ans
+
+
+def selected_slots_sql(many_frames, slot_kind, slot_list_order_kind):
+    r'''Generates the sql_lines for one variant of the selected_slots SQL.
+
+    `many_frames` is True for "frame_id IN (::frame_id)".
+
+    `slot_kind` is None, 'name', 'names' or 'slot_id'.
+
+    `slot_list_order_kind` is 'all', 'null' or 'value'.
+
+    Every table access here is an index SEARCH (see frame_schema.sql):
+
+        - Slot by Slot_index (frame_id, name, slot_list_order)
+        - Slot_version by Slot_version_index (slot_id, version_id)
+        - Version_subsets by its primary key (superset_id, subset_id)
+
+    Frame_slots is a view, so can't be indexed itself.
+    '''
+    # applicable_versions is target_version_id and all of its subsets.
+    sql_lines = [
+	'WITH applicable_versions(version_id) AS (',
+	'       SELECT :target_version_id',
+	'        UNION',
+	'       SELECT subset_id',
+	'         FROM Version_subsets',
+	'        WHERE superset_id = :target_version_id)',
+	'SELECT fs.*',
+	'  FROM Frame_slots fs',
+    ]
+
+    # LEFT JOIN any other applicable Slot_version ("super") that is a
+    # superset of fs.version_id, and so overrides fs.  This is an anti-join,
+    # only rows with no super are selected in the WHERE clause below.
+    #
+    # fs.version_id is target_version_id can't be overridden, so skip the
+    # join for these direct hits.
+    sql_lines.extend([
+	'       LEFT JOIN Slot_version super',
+	'         ON super.slot_id = fs.slot_id',
+	'            AND fs.version_id != :target_version_id',
+	'            AND super.version_id != fs.version_id',
+	'            AND super.version_id IN applicable_versions',
+	'            AND EXISTS (SELECT NULL',
+	'                          FROM Version_subsets vs',
+	'                         WHERE vs.superset_id = super.version_id',
+	'                           AND vs.subset_id = fs.version_id)',
+    ])
+    if many_frames:
+        sql_lines.append(
+	' WHERE fs.frame_id IN (::frame_id)')
+    else:
+        sql_lines.append(
+	' WHERE fs.frame_id = :frame_id')
+    if slot_kind == 'name':
+        sql_lines.append(
+        '   AND fs.name = :name')
+    elif slot_kind == 'names':
+        sql_lines.append(
+        '   AND fs.name IN (::name)')
+    elif slot_kind == 'slot_id':
+        sql_lines.append(
+        '   AND fs.slot_id = :slot_id')
+    if slot_list_order_kind == 'null':
+        sql_lines.append(
+        '   AND fs.slot_list_order IS NULL')
+    elif slot_list_order_kind == 'value':
+        sql_lines.append(
+        '   AND fs.slot_list_order = :slot_list_order')
+
+    # AND fs.version_id is applicable
+    #     AND There is no super
+    sql_lines.extend([
+	'   AND fs.version_id IN applicable_versions',
+	'   AND super.slot_id IS NULL',
+    ])
+    sql_lines.append(
+	' ORDER BY fs.frame_id, fs.name, fs.slot_list_order, fs.slot_id')
+    return tuple(sql_lines)
+
+
+# {(many_frames, slot_kind, slot_list_order_kind): sql_lines}
+Selected_slots_sql = {
+    (many_frames, slot_kind, slot_list_order_kind):
+      selected_slots_sql(many_frames, slot_kind, slot_list_order_kind)
+    for many_frames in (False, True)
+    for slot_kind in (None, 'name', 'names', 'slot_id')
+    for slot_list_order_kind in ('all', 'null', 'value')
+}
+
+
+def best_slots_sql(sql_lines):
+    r'''Wraps the `sql_lines` from selected_slots_sql to pick one row per
+    slot_id.
+
+    The row picked is the lowest version_id that isn't "<DELETED>", or the
+    highest version_id if they are all "<DELETED>" (the same order as
+    get_one_selected_slot uses).
+
+    Adds two columns: slot_rank (always 1), and live_count, the number of
+    versions of the slot_id that aren't "<DELETED>".  A live_count > 1 is an
+    ambiguity.
+    '''
+    return ('SELECT *',
+            '  FROM (SELECT c.*,',
+            '               ROW_NUMBER() OVER (',
+            '                 PARTITION BY c.slot_id',
+            "                 ORDER BY c.value = '<DELETED>',",
+            "                          CASE WHEN c.value = '<DELETED>'",
+            '                               THEN -c.version_id',
+            '                               ELSE c.version_id',
+            '                          END) AS slot_rank,',
+            "               COUNT(*) FILTER (WHERE c.value != '<DELETED>')",
+            '                 OVER (PARTITION BY c.slot_id) AS live_count',
+            # Drop the inner "ORDER BY"
+            '          FROM (', *sql_lines[:-1], ') c)',
+            ' WHERE slot_rank = 1',
+            ' ORDER BY frame_id, name, slot_list_order, slot_id')
+
+
+# {(many_frames, slot_kind, slot_list_order_kind): sql_lines}
+Best_slots_sql = {key: best_slots_sql(sql_lines)
+                  for key, sql_lines in Selected_slots_sql.items()}
+
+
+def execute_slots_sql(version_obj, stmt_key, sql_lines, params):
+    r'''Executes `sql_lines` for the Selected_slots_sql key in stmt_key[1:].
+
+    The prepared statement is cached in version_obj.stmt_cache under
+    `stmt_key`, except for the "::" variants, which can't be prepared.
+    '''
+    many_frames, slot_kind, _ = stmt_key[1:]
+    if many_frames or slot_kind == 'names':
+        # ::name parameters can't be prepared
+        version_obj.execute(*sql_lines, **params)
+    else:
+        prepared = version_obj.stmt_cache.get(stmt_key)
+        if prepared is None:
+            prepared = version_obj.prepare(*sql_lines)
+            version_obj.stmt_cache[stmt_key] = prepared
+        version_obj.execute_prepared(prepared, **params)
 
 
 def selected_slots(version_obj, frame_id, slot=None, slot_list_order='all',
@@ -65,71 +232,211 @@ def selected_slots(version_obj, frame_id, slot=None, slot_list_order='all',
 
     Ambiguities not identified here.
 
-    `slot` may omitted to get all slots, a str for the desired slot name, or
-    an int for the desired slot_id.
+    `frame_id` may be a single frame_id, or an iterable of frame_ids.
+
+    `slot` may omitted to get all slots, a str for the desired slot name, an
+    iterable of slot names, or an int for the desired slot_id.
      
-    Slots are ordered by slot_id.
+    Slots are ordered by frame_id, name, slot_list_order, slot_id.
 
     <DELETED> slots are included.
     '''
+    key, params = selected_slots_params(version_obj, frame_id, slot,
+                                        slot_list_order, version_id)
+    execute_slots_sql(version_obj, ('selected_slots',) + key,
+                      Selected_slots_sql[key], params)
+
+
+def selected_slots_params(version_obj, frame_id, slot, slot_list_order,
+                          version_id):
+    r'''Returns the Selected_slots_sql key, and the sql params, for a query.
+
+    Takes the same parameters as selected_slots.
+    '''
     if version_id is None:
         version_id = version_obj.version_id
-    sql_lines = [
+    params = dict(frame_id=frame_id, target_version_id=version_id)
+    if slot is None:
+        slot_kind = None
+    elif isinstance(slot, str):
+        slot_kind = 'name'
+        params['name'] = slot
+    elif isiter(slot):
+        slot_kind = 'names'
+        params['name'] = slot
+    else:
+        slot_kind = 'slot_id'
+        params['slot_id'] = slot
+    if slot_list_order == 'all':
+        slot_list_order_kind = 'all'
+    elif slot_list_order is None:
+        slot_list_order_kind = 'null'
+    else:
+        slot_list_order_kind = 'value'
+        params['slot_list_order'] = slot_list_order
+    return (isiter(frame_id), slot_kind, slot_list_order_kind), params
+
+
+def get_one_selected_slot(version_obj, frame_id, name, slot_list_order=None,
+                          version_id=None):
+    r'''Gets the selected slot for `name`[`slot_list_order`] in `frame_id`.
+
+    Returns a Frame_slots row, or None.
+
+    Ambiguities are not reported.  Like get_selected_slots, this picks the
+    lowest version_id that isn't "<DELETED>", or the highest version_id if
+    they are all "<DELETED>"; but does it in the SQL with "LIMIT 1".
+    '''
+    key, params = selected_slots_params(version_obj, frame_id, name,
+                                        slot_list_order, version_id)
+    stmt_key = ('one_selected_slot',) + key
+    prepared = version_obj.stmt_cache.get(stmt_key)
+    if prepared is None:
+        # Drop the "ORDER BY"
+        prepared = version_obj.prepare(*Selected_slots_sql[key][:-1],
+            " ORDER BY fs.value = '<DELETED>',",
+            "          CASE WHEN fs.value = '<DELETED>' THEN -fs.version_id",
+            "               ELSE fs.version_id",
+            "          END",
+            " LIMIT 1")
+        version_obj.stmt_cache[stmt_key] = prepared
+    version_obj.execute_prepared(prepared, **params)
+    return version_obj.fetchone()
+
+
+# The "label" of an ako/isa value: the value without its leading '$'.
+Link_label = "substr(fs.value, 1 + (substr(fs.value, 1, 1) = '$'))"
+
+# Walks the selected ako/isa links up from :frame_id, for
+# :target_version_id.  This uses the same version selection as
+# selected_slots_sql.
+Ancestor_links_sql = (
+	'WITH RECURSIVE applicable_versions(version_id) AS (',
+	'       SELECT :target_version_id',
+	'        UNION',
+	'       SELECT subset_id',
+	'         FROM Version_subsets',
+	'        WHERE superset_id = :target_version_id),',
+	'     links(frame_id, name, value, slot_id, version_id, inh_frame_id)',
+	'       AS (',
+	'       SELECT NULL, NULL, NULL, NULL, NULL, :frame_id',
+	'        UNION',
+	'       SELECT fs.frame_id, lower(fs.name), fs.value, fs.slot_id,',
+	'              fs.version_id,',
+	f"              CASE WHEN {Link_label} != ''",
+	f"                        AND {Link_label} NOT GLOB '*[^0-9]*'",
+	f"                   THEN CAST({Link_label} AS INTEGER)",
+	'                   ELSE f.frame_id',
+	'              END',
+	'         FROM links l',
+	'              INNER JOIN Frame_slots fs',
+	'                 ON fs.frame_id = l.inh_frame_id',
+	'              LEFT JOIN Slot_version super',
+	'                ON super.slot_id = fs.slot_id',
+	'                   AND fs.version_id != :target_version_id',
+	'                   AND super.version_id != fs.version_id',
+	'                   AND super.version_id IN applicable_versions',
+	'                   AND EXISTS (SELECT NULL',
+	'                                 FROM Version_subsets vs',
+	'                                WHERE vs.superset_id = super.version_id',
+	'                                  AND vs.subset_id = fs.version_id)',
+	f'              LEFT JOIN Frame f ON f.name = {Link_label}',
+	"        WHERE fs.name IN ('ako', 'isa')",
+	"          AND fs.value != '<DELETED>'",
+	'          AND fs.version_id IN applicable_versions',
+	'          AND super.slot_id IS NULL)',
 	'SELECT *',
-	'  FROM Frame_slots fs',
-	' WHERE frame_id = :frame_id',
-    ]
-    params = {}
-    if slot is not None:
-        if isinstance(slot, str):
-            sql_lines.append(
-        '   AND name = :name')
-            params['name'] = slot
-        else:
-            sql_lines.append(
-        '   AND slot_id = :slot_id')
-            params['slot_id'] = slot
-    if slot_list_order != 'all':
-        if slot_list_order is None:
-            sql_lines.append(
-        '   AND slot_list_order IS NULL')
-        else:
-            sql_lines.append(
-        '   AND slot_list_order = :slot_list_order')
-            params['slot_list_order'] = slot_list_order
+	'  FROM links',
+	' WHERE frame_id IS NOT NULL',
+)
 
-    # AND fs.version_id is subset of target_version_id
-    sql_lines.extend([
-        '   AND (version_id = :target_version_id',
-        '        OR EXISTS (SELECT NULL FROM Version_subsets',
-        '                    WHERE superset_id = :target_version_id',
-        '                      AND subset_id = fs.version_id)',
-    ])
 
-    # AND There is no other Slot_version ("super") that is a superset of
-    #     fs.version_id and a subset of target_version_id
-    sql_lines.extend([
-	'   AND NOT EXISTS (',
-	'         SELECT NULL',
-	'           FROM Slot_version super',
-	'                INNER JOIN Version_subsets vs',
-	'                   ON vs.superset_id = super.version_id',
-	'                      AND vs.subset_id = fs.version_id',
-	'          WHERE super.slot_id = fs.slot_id',
-        '            AND super.version_id != fs.version_id',
-	'            AND (super.version_id = :target_version_id',
-	'                 OR EXISTS (',
-	'                    SELECT NULL',
-	'                      FROM Version_subsets',
-	'                     WHERE superset_id = :target_version_id',
-	'                       AND subset_id = super.version_id))))',
-    ])
-    sql_lines.append(
-	' ORDER BY slot_id')
-    version_obj.execute(*sql_lines,
-                  frame_id=frame_id,
-                  target_version_id=version_id,
-                  **params)
+def get_ancestor_frame_ids(version_obj, frame_id, version_id=None):
+    r'''Gets the 'ako' and 'isa' links for `frame_id` and all its ancestors.
+
+    Returns links, missing.
+
+    links is {frame_id: {'ako': inh_frame_id, 'isa': inh_frame_id}}, where
+    missing (or "<DELETED>") links are None.
+
+    missing is {(frame_id, 'ako' or 'isa'): frame_label} for the links whose
+    frame isn't found.  These are None in `links`, and it's up to the caller
+    to raise NameError if it actually needs to follow one of them.
+
+    Does one SELECT, with a recursive CTE walking the links.
+
+    Raises AssertionError if a link has ambiguous versions.
+    '''
+    if version_id is None:
+        version_id = version_obj.version_id
+    prepared = version_obj.stmt_cache.get('ancestor_links')
+    if prepared is None:
+        prepared = version_obj.prepare(*Ancestor_links_sql)
+        version_obj.stmt_cache['ancestor_links'] = prepared
+    version_obj.execute_prepared(prepared, frame_id=frame_id,
+                                 target_version_id=version_id)
+    links = {frame_id: dict(ako=None, isa=None)}
+    missing = {}
+    slot_ids = set()
+    for row in version_obj.fetchall():
+        if row['slot_id'] in slot_ids:
+            raise AssertionError(
+                    f"Ambiguious versions for "
+                    f"frame_id {row['frame_id']}, slot_id {row['slot_id']}")
+        slot_ids.add(row['slot_id'])
+        frame_links = links.setdefault(row['frame_id'],
+                                       dict(ako=None, isa=None))
+        if row['inh_frame_id'] is None:
+            frame_label = row['value']
+            if frame_label[0] == '$':
+                frame_label = frame_label[1:]
+            missing[row['frame_id'], row['name']] = frame_label
+            continue
+        frame_links[row['name']] = row['inh_frame_id']
+        links.setdefault(row['inh_frame_id'], dict(ako=None, isa=None))
+    return links, missing
+
+
+def merge_inherited_slots(slots, inh_slots):
+    r'''Merges the `inh_slots` inherited into `slots`.
+
+    Both are lists of Frame_slot rows in slot_list_order.  This must hold
+    for heapq.merge; get_inherited_slots gets it from get_selected_slots
+    ordering each frame's slots by name, slot_list_order for one slot name.
+    '''
+    if len(slots) == 1 and slots[0]['slot_list_order'] is None:
+        # 1 answer with no slot_list_order, this overrides ALL inherited
+        # slots!
+        return slots
+    if len(inh_slots) == 1 and inh_slots[0]['slot_list_order'] is None:
+        # 1 answer with no slot_list_order, this overrides ALL inherited
+        # slots!  Also overridden by any lower slots.
+        if slots:
+            return slots
+        return inh_slots
+
+    assert all(slo_key(a) <= slo_key(b) for a, b in pairwise(slots)), \
+           "slots not in slot_list_order"
+    assert all(slo_key(a) <= slo_key(b) for a, b in pairwise(inh_slots)), \
+           "inh_slots not in slot_list_order"
+
+    # Fast paths, where nothing needs to be interleaved
+    if not inh_slots:
+        return slots
+    if not slots:
+        return inh_slots
+    if slo_key(slots[-1]) < slo_key(inh_slots[0]):
+        return slots + inh_slots
+    if slo_key(inh_slots[-1]) < slo_key(slots[0]):
+        return inh_slots + slots
+
+    # merge slot values, base slots override inherited slots with the same
+    # slot_list_order
+    base_orders = set(map(slo_key, slots))
+    return list(merge(slots,
+                      (inh_slot for inh_slot in inh_slots
+                       if slo_key(inh_slot) not in base_orders),
+                      key=slo_key))
 
 
 def get_inherited_slots(version_obj, frame_id, slot_name, version_id=None,
@@ -142,52 +449,64 @@ def get_inherited_slots(version_obj, frame_id, slot_name, version_id=None,
     Includes <DELETED> slots.
 
     Does not do splicing!
-    '''
-    slots = get_selected_slots(version_obj, frame_id, slot_name, version_id)
-    if len(slots) == 1 and slots[0]['slot_list_order'] is None:
-        # 1 answer with no slot_list_order, this overrides ALL inherited slots!
-        return slots
 
-    def inherit_slots(link, do_isa):
-        inh_frame_id = get_selected_frame(version_obj, frame_id, version_id) \
-                         [link]
-        if inh_frame_id is None:
-            return slots
+    `slot_name` must be a single slot name, as the slots are merged by
+    slot_list_order alone.
+
+    The slots for `frame_id` and all of its ancestors are read with one
+    SELECT, after get_ancestor_frame_ids has found the ancestors.
+    '''
+    links, missing = get_ancestor_frame_ids(version_obj, frame_id, version_id)
+    slots_by_frame = defaultdict(list)
+    for row in get_selected_slots(version_obj, links.keys(), slot_name,
+                                  version_id=version_id):
+        slots_by_frame[row['frame_id']].append(row)
 
-        inh_slots = get_inherited_slots(version_obj, inh_frame_id,
-                                        slot_name, version_id, do_isa)
-        if len(inh_slots) == 1 and inh_slots[0]['slot_list_order'] is None:
+    # Walks the ancestors with an explicit stack, rather than recursion.  A
+    # (frame_id, do_isa) is only popped once its inherited slots (ako, then
+    # isa when do_isa) are all in `inherited`.
+    inherited = {}   # {(frame_id, do_isa): slots}
+    start = frame_id, do_isa
+    stack = [start]
+    on_stack = set(stack)
+    while stack:
+        key = stack[-1]
+        frame_id, do_isa = key
+        slots = slots_by_frame[frame_id]
+        if len(slots) == 1 and slots[0]['slot_list_order'] is None:
             # 1 answer with no slot_list_order, this overrides ALL inherited
-            # slots!  Also overridden by any lower slots.
-            if slots:
-                return slots
-            return inh_slots
+            # slots!
+            inherited[key] = slots
         else:
-            # merge slot values
-            new_slots = []
-            i = j = 0
-            while i < len(slots) and j < len(inh_slots):
-                base_slot = slots[i]
-                inh_slot = inh_slots[j]
-                if base_slot[1] <= inh_slot[1]:
-                    new_slots.append(base_slot)
-                    i += 1
-                    if base_slot[1] == inh_slot[1]:
-                        j += 1
-                else:
-                    new_slots.append(inh_slot)
-                    j += 1
-            new_slots.extend(slots[i:])
-            new_slots.extend(inh_slots[j:])
-            return new_slots
-
-    # Do ako inheritance:
-    slots = inherit_slots('ako', do_isa)
-
-    if do_isa:
-        # Do isa inheritance:
-        return inherit_slots('isa', do_isa=False)
-    return slots
+            link_names = ('ako', 'isa') if do_isa else ('ako',)
+            for link_name in link_names:
+                # Dangling links are only an error if they have to be followed.
+                if (frame_id, link_name) in missing:
+                    frame_label = missing[frame_id, link_name]
+                    raise NameError(f"Frame {frame_label!r} not found")
+            parents = [(links[frame_id]['ako'], do_isa)]
+            if do_isa:
+                parents.append((links[frame_id]['isa'], False))
+            parents = [parent for parent in parents if parent[0] is not None]
+            pending = [parent for parent in parents
+                              if parent not in inherited]
+            if pending:
+                # Only one at a time, so that the stack is always a single
+                # path of inheritance.
+                if pending[0] in on_stack:
+                    raise AssertionError(
+                            f"Inheritance loop through frame_id "
+                            f"{pending[0][0]}")
+                stack.append(pending[0])
+                on_stack.add(pending[0])
+                continue
+            for parent in parents:
+                slots = merge_inherited_slots(slots, inherited[parent])
+            inherited[key] = slots
+        stack.pop()
+        on_stack.discard(key)
+
+    return inherited[start]
 
 
 def load_yaml(conn, frames):
@@ -199,6 +518,10 @@ def load_yaml(conn, frames):
     version_obj = conn.at_version(frames['user'], frames['selected_version'],
                                   for_update=True)
     with version_obj:
+        # Look up the frame_names used in all of the sections with one SELECT
+        # up front.  The load_xxx_frames calls below then find them cached.
+        version_obj.lookup_ids(chain.from_iterable(
+                                 map(section_refs, frames['frames'])))
         for section in frames['frames']:
             if 'add' in section:
                 load_add_frames(version_obj, section['add'])
@@ -210,17 +533,105 @@ def load_yaml(conn, frames):
                 raise KeyError(f"Missing change-type in {section}")
 
 
+def section_refs(section):
+    r'''Yields the frame_labels referenced by one `section` of load_yaml.
+    '''
+    if 'add' in section:
+        for frame in section['add']:
+            if frame.get('frame_name'):
+                yield frame['frame_name']
+    elif 'change' in section:
+        yield from collect_refs(section['change'])
+    elif 'delete' in section:
+        yield from section['delete']
+
+
+class pending_slots:
+    r'''The slots of new frames, waiting to be written.
+
+    Slots are added with `add`, and written by `flush` with one insert_many
+    into each of Slot and Slot_version for each `chunk_size` slots.
+
+    The slot_ids are read back with one SELECT on the frame_ids in between.
+    This only works because the frames are new, so the only Slots they have
+    are the ones added here.
+    '''
+    def __init__(self, version_obj, chunk_size=500):
+        self.version_obj = version_obj
+        self.chunk_size = chunk_size
+
+        # [(frame_id, name, slot_list_order, description, value)]
+        self.slots = []
+
+    def add(self, frame_id, name, slot_list_order, description, db_value):
+        self.slots.append((frame_id, name, slot_list_order, description,
+                           db_value))
+        if len(self.slots) >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        if not self.slots:
+            return
+        slots = self.slots
+        self.slots = []
+        version_obj = self.version_obj
+        user = version_obj.user
+        now = version_obj.now
+        frame_ids, names, slot_list_orders, descriptions, db_values = \
+          zip(*slots)
+        version_obj.insert_many("Slot",
+                                frame_id=frame_ids,
+                                name=names,
+                                slot_list_order=slot_list_orders,
+                                creation_user=user,
+                                creation_timestamp=now)
+        version_obj.select("Slot", "slot_id, frame_id, name, slot_list_order",
+                           frame_id=set(frame_ids))
+        # Keyed on (frame_id, name, slot_list_order), which is only unique
+        # because the frames are new (see above).  The slot_list_orders read
+        # back are floats (the column is real), where the ones added may be
+        # ints, but 1000.0 and 1000 are the same dict key.
+        slot_ids = {(row['frame_id'], row['name'].lower(),
+                     row['slot_list_order']):
+                      row['slot_id']
+                    for row in version_obj.fetchall()}
+        version_obj.insert_many("Slot_version",
+                                slot_id=[slot_ids[frame_id, name.lower(),
+                                                  slot_list_order]
+                                         for frame_id, name, slot_list_order
+                                          in zip(frame_ids, names,
+                                                 slot_list_orders)],
+                                version_id=version_obj.version_id,
+                                description=descriptions,
+                                value=db_values,
+                                creation_user=user,
+                                creation_timestamp=now)
+
+
 def load_add_frames(version_obj, frames):
-    for frame in frames:
-        load_add_frame(version_obj, frame)
+    # Check all of the new frame_names with one SELECT.
+    version_obj.lookup_ids(frame['frame_name'] for frame in frames
+                                               if frame.get('frame_name'))
+
+    # The slots for all of `frames` are written together at the end.
+    version_obj.pending_slots = pending_slots(version_obj)
+    try:
+        for frame in frames:
+            load_add_frame(version_obj, frame)
+        version_obj.pending_slots.flush()
+    finally:
+        version_obj.pending_slots = None
 
 
 def load_add_frame(version_obj, frame):
     r'''Returns '$xxx' frame reference.
+
+    The new slots go to version_obj.pending_slots, if set (by
+    load_add_frames), to be written later.  Otherwise, they are written
+    before returning.
     '''
-    fields = frame.copy()
-    frame_name = fields.pop('frame_name', None)
-    print("adding frame", frame_name)
+    frame_name = frame.get('frame_name')
+    #print("adding frame", frame_name)
     if frame_name is not None:
         try:
             frame_id = version_obj.get_frame_id(frame_name)
@@ -232,100 +643,276 @@ def load_add_frame(version_obj, frame):
                        creation_user=version_obj.user,
                        creation_timestamp=version_obj.now)
     frame_id = version_obj.lastrowid
-    print("created new frame_id", frame_id, "for", frame_name)
+    #print("created new frame_id", frame_id, "for", frame_name)
+    version_obj.frame_labels[frame_id] = frame_name
+    if frame_name is not None:
+        version_obj.frame_names[frame_name.lower()] = frame_id
+
+    # The new frame has no slots yet, so rather than going through
+    # load_add_slot for each value, all of its slots are gathered here and
+    # written through pending_slots.
+    slots = {}  # {(name.lower(), slot_list_order): (name, description, value)}
 
-    for name, value in fields.items():
-        load_add_slot(version_obj, frame_id, name, value)
+    def add_slot(name, slot_list_order, description, db_value):
+        key = name.lower(), slot_list_order
+        if key in slots:
+            raise AssertionError(
+                    f"frame_id {frame_id}.{name}[{slot_list_order}]: "
+                    "Can not add slot that is already there")
+        slots[key] = name, description, db_value
+
+    for name, value in frame.items():
+        if name == 'frame_name':
+            continue
+        check_slot(name, value)
+        if islist(value):
+            slot_list_order = 1000
+            for v in value:
+                slot_list_order, description, db_value = \
+                  unwrap_value(version_obj, v, slot_list_order)
+                add_slot(name, slot_list_order, description, db_value)
+                slot_list_order += 1
+        else:
+            add_slot(name, *unwrap_value(version_obj, value))
+
+    pending = version_obj.pending_slots
+    if pending is None:
+        pending = pending_slots(version_obj)
+    for (_, slot_list_order), (name, description, db_value) in slots.items():
+        pending.add(frame_id, name, slot_list_order, description, db_value)
+    if pending is not version_obj.pending_slots:
+        pending.flush()
 
     return f"${frame_name or frame_id}"
 
 
+def check_slot(name, value):
+    r'''Checks the slot `name` and `value` for load_add_frame and
+    load_add_slot.
+    '''
+    if name.lower() in reserved_slot_names:
+        raise ValueError(f"Illegal slot_name: {name}")
+    if '[' in name:
+        raise AssertionError(f"'[' not legal in slot name {name}")
+    if islist(value):
+        for v in value:
+            assert not islist(v), f"nested list in slot {name}"
+
+
+def unwrap_value(version_obj, value, slot_list_order=None):
+    r'''Unwraps the {value: ..., slot_list_order: ..., description: ...} dicts
+    around `value`.
+
+    A dict `value` (without a 'value' key) is added as a new frame.
+
+    Returns slot_list_order, description, db_value.
+    '''
+    description = None
+    while isinstance(value, dict) and 'value' in value:
+        if 'slot_list_order' in value:
+            slot_list_order = value['slot_list_order']
+        if 'description' in value:
+            description = value['description']
+        value = value['value']
+    if isinstance(value, dict):
+        db_value = load_add_frame(version_obj, value)
+    else:
+        db_value = str(value)
+    return slot_list_order, description, db_value
+
+
 def load_add_slot(version_obj, frame_id, name, value, slot_list_order=None,
-                  splice_ok=False):
+                  splice_ok=False, current_slots=None, slot_ids=None):
     r'''Returns slot_list_order used.
+
+    `current_slots`, if given, is {(name.lower(), slot_list_order): row} of
+    the selected slots already in `frame_id` (see get_current_slots).  It is
+    used in place of a get_selected_slots call for each slot, and is kept up
+    to date with the slots added here.
+
+    `slot_ids`, if given, is {(name.lower(), slot_list_order): slot_id} of
+    all of the Slot rows in `frame_id` (see get_slot_ids).  It is used in
+    place of a SELECT on Slot for each slot, and is kept up to date with the
+    Slot rows added here.
     '''
-    if name.lower() in ('frame_name',):
-        raise ValueError(f"Illegal slot_name: {name}")
+    splice = '[' in name and splice_ok and slot_list_order is None
+    if not splice:
+        check_slot(name, value)
 
-    if '[' in name:
-        if splice_ok and slot_list_order is None:
-            load_splice(version_obj, frame_id, name, value)
-        else:
-            raise AssertionError(f"'[' not legal in slot name {name}")
+    version_obj.forget_frame(frame_id)
+
+    if splice:
+        load_splice(version_obj, frame_id, name, value)
     elif islist(value):
         assert slot_list_order is None
         slot_list_order = 1000
         for v in value:
-            slot_list_order = \
-              load_add_slot(version_obj, frame_id, name, v, slot_list_order) + 1
+            slot_list_order, description, db_value = \
+              unwrap_value(version_obj, v, slot_list_order)
+            add_slot_value(version_obj, frame_id, name, slot_list_order,
+                           description, db_value, current_slots, slot_ids)
+            slot_list_order += 1
     else:
-        description = None
-        while isinstance(value, dict) and 'value' in value:
-            if 'slot_list_order' in value:
-                slot_list_order = value['slot_list_order']
-            if 'description' in value:
-                description = value['description']
-            value = value['value']
-        if isinstance(value, dict):
-            db_value = load_add_frame(version_obj, value)
-        else:
-            db_value = str(value)
+        slot_list_order, description, db_value = \
+          unwrap_value(version_obj, value, slot_list_order)
+        add_slot_value(version_obj, frame_id, name, slot_list_order,
+                       description, db_value, current_slots, slot_ids)
+    return slot_list_order
+
+
+def add_slot_value(version_obj, frame_id, name, slot_list_order,
+                   description, db_value, current_slots=None, slot_ids=None):
+    r'''Adds one (already unwrapped) slot value for load_add_slot.
+    '''
+    user = version_obj.user
+    now = version_obj.now
+    version_id = version_obj.version_id
 
-        # Does slot already have a value assigned for this version?
+    # Does slot already have a value assigned for this version?
+    key = name.lower(), slot_list_order
+    if current_slots is None:
         current_rows = get_selected_slots(version_obj, frame_id, name,
                                           slot_list_order)
-        print("load_add_slot", frame_id, name, slot_list_order, current_rows)
-        if current_rows:  # Can only be 0 or 1 row
-            # Yes!
-            old_slot = current_rows[0]
-            if old_slot['value'].upper() != '<DELETED>':
-                raise AssertionError(
-                        f"frame_id {frame_id}.{name}[{slot_list_order}]: "
-                        "Can not add slot that is already there")
-            if old_slot['version_id'] == version_obj.version_id:
-                # Update Slot_version
-                version_obj.update("Slot_version",
-                                   dict(slot_id=slot_id,
-                                        version_id=version_obj.version_id),
-                                   description=description,
-                                   value=db_value,
-                                   updated_user=version_obj.user,
-                                   updated_timestamp=version_obj.now)
-                return slot_list_order
-
-        # slot_id already assigned?
-        try:
-            slot_id = version_obj.select_1_value("Slot", "slot_id",
-                                    frame_id=frame_id,
-                                    name=name,
-                                    slot_list_order=slot_list_order)
-        except AssertionError:
-            # No, create new Slot row...
-            version_obj.insert("Slot",
-                               frame_id=frame_id,
-                               name=name,
-                               slot_list_order=slot_list_order,
-                               creation_user=version_obj.user,
-                               creation_timestamp=version_obj.now)
-            slot_id = version_obj.lastrowid
-        version_obj.insert("Slot_version",
-                           slot_id=slot_id,
-                           version_id=version_obj.version_id,
-                           description=description,
-                           value=db_value,
-                           creation_user=version_obj.user,
-                           creation_timestamp=version_obj.now)
-    return slot_list_order
+    elif key in current_slots:
+        current_rows = [current_slots[key]]
+    else:
+        current_rows = []
+    #print("add_slot_value", frame_id, name, slot_list_order, current_rows)
+    if current_rows:  # Can only be 0 or 1 row
+        # Yes!
+        old_slot = current_rows[0]
+        if old_slot['value'].upper() != '<DELETED>':
+            raise AssertionError(
+                    f"frame_id {frame_id}.{name}[{slot_list_order}]: "
+                    "Can not add slot that is already there")
+        if old_slot['version_id'] == version_id:
+            # Update Slot_version
+            update_slot_version(version_obj, old_slot['slot_id'],
+                                description, db_value)
+            if current_slots is not None:
+                current_slots[key] = dict(old_slot, value=db_value)
+            return
+
+    # slot_id already assigned?
+    slot_id = get_slot_id(version_obj, frame_id, name, slot_list_order,
+                          slot_ids)
+    if slot_id is None:
+        # No, create new Slot row...
+        version_obj.insert("Slot",
+                           frame_id=frame_id,
+                           name=name,
+                           slot_list_order=slot_list_order,
+                           creation_user=user,
+                           creation_timestamp=now)
+        slot_id = version_obj.lastrowid
+        if slot_ids is not None:
+            slot_ids[key] = slot_id
+    version_obj.insert("Slot_version",
+                       slot_id=slot_id,
+                       version_id=version_id,
+                       description=description,
+                       value=db_value,
+                       creation_user=user,
+                       creation_timestamp=now)
+    if current_slots is not None:
+        current_slots[key] = dict(slot_id=slot_id,
+                                  version_id=version_id,
+                                  value=db_value)
+
+
+def update_slot_version(version_obj, slot_id, description, db_value):
+    r'''Updates the Slot_version for `slot_id` in version_obj's version.
+    '''
+    version_obj.update("Slot_version",
+                       dict(slot_id=slot_id,
+                            version_id=version_obj.version_id),
+                       description=description,
+                       value=db_value,
+                       updated_user=version_obj.user,
+                       updated_timestamp=version_obj.now)
+
+
+def get_current_slots(version_obj, frame_id, names=None):
+    r'''Returns {(name.lower(), slot_list_order): row} for the selected slots
+    with `names` (default all) in `frame_id`.
+
+    This is the `current_slots` for load_add_slot and load_change_slot.
+
+    Ambiguities are not reported, the row picked is the one that
+    get_one_selected_slot would pick.
+    '''
+    return {(row['name'].lower(), row['slot_list_order']): row
+            for row in get_selected_slots(version_obj, frame_id, names,
+                                          exc_on_ambiguity=False)}
+
+
+def get_slot_ids(version_obj, frame_id):
+    r'''Returns {(name.lower(), slot_list_order): slot_id} for all of the Slot
+    rows in `frame_id`, in any version.
+
+    This is the `slot_ids` for load_add_slot and load_change_slot.
+    '''
+    version_obj.select("Slot", "slot_id, name, slot_list_order",
+                       frame_id=frame_id)
+    return {(row['name'].lower(), row['slot_list_order']): row['slot_id']
+            for row in version_obj}
+
+
+def get_slot_id(version_obj, frame_id, name, slot_list_order, slot_ids=None):
+    r'''Returns the slot_id of `name`[`slot_list_order`] in `frame_id`.
+
+    Looks in `slot_ids` (see get_slot_ids), if given, rather than doing a
+    SELECT.  Returns None if there is no such Slot row.
+    '''
+    if slot_ids is not None:
+        return slot_ids.get((name.lower(), slot_list_order))
+    try:
+        return version_obj.select_1_value("Slot", "slot_id",
+                                          frame_id=frame_id,
+                                          name=name,
+                                          slot_list_order=slot_list_order)
+    except AssertionError:
+        return None
+
+
+def collect_refs(changes):
+    r'''Yields every frame_label referenced in `changes`.
+
+    These are the frames being changed, plus every '$xxx' value anywhere in
+    their commands.
+    '''
+    def refs(value):
+        if isinstance(value, str):
+            if value.startswith('$'):
+                yield value
+        elif isinstance(value, dict):
+            for v in value.values():
+                yield from refs(v)
+        elif islist(value):
+            for v in value:
+                yield from refs(v)
+
+    for change in changes:
+        for frame_name, commands in change.items():
+            yield frame_name
+            yield from refs(commands)
 
 
 def load_change_frames(version_obj, changes):
+    # Look up all of the frame_names referenced with one SELECT.
+    version_obj.lookup_ids(collect_refs(changes))
     for change in changes:
         if len(change) != 1:
             raise AssertionError(
                     f"Only one frame per change allowed {change.keys()}")
         for frame_name, commands in change.items():
             frame_id = version_obj.get_frame_id(frame_name)
-            print("changing", frame_id, frame_name)
+            #print("changing", frame_id, frame_name)
+
+            # Read all of the frame's current slots, and slot_ids, once for
+            # all commands.
+            current_slots = get_current_slots(version_obj, frame_id)
+            slot_ids = get_slot_ids(version_obj, frame_id)
             for command in commands:
                 if len(command) != 1:
                     raise AssertionError(
@@ -335,26 +922,37 @@ def load_change_frames(version_obj, changes):
                     if command_name == 'add':
                         for slot_name, value in slots.items():
                             load_add_slot(version_obj, frame_id,
-                                          slot_name, value, splice_ok=True)
+                                          slot_name, value, splice_ok=True,
+                                          current_slots=current_slots,
+                                          slot_ids=slot_ids)
                     elif command_name == 'change':
                         for slot_name, value in slots.items():
                             load_change_slot(version_obj, frame_id,
-                                             slot_name, value)
+                                             slot_name, value,
+                                             current_slots=current_slots,
+                                             slot_ids=slot_ids)
                     elif command_name == 'delete':
                         for slot_name in slots:
-                            load_delete_slot(version_obj, frame_id, slot_name)
+                            load_delete_slot(version_obj, frame_id, slot_name,
+                                             current_slots=current_slots,
+                                             slot_ids=slot_ids)
                     else:
                         raise ValueError(f"Command in {frame_name} "
                                          f"must be add/change/delete, "
                                          f"got {command_name}")
 
 
-def load_change_slot(version_obj, frame_id, name, value, forced=False):
+def load_change_slot(version_obj, frame_id, name, value, forced=False,
+                     current_slots=None, slot_ids=None):
     r'''Doesn't return anything.
+
+    `current_slots` and `slot_ids` are as for load_add_slot.
     '''
-    if name.lower() in ('frame_name',):
+    if name.lower() in reserved_slot_names:
         raise ValueError(f"Illegal slot_name: {name}")
 
+    version_obj.forget_frame(frame_id)
+
     if '[' in name:
         load_splice(version_obj, frame_id, name, value)
     elif islist(value):
@@ -374,63 +972,85 @@ def load_change_slot(version_obj, frame_id, name, value, forced=False):
         else:
             db_value = str(value)
 
+        user = version_obj.user
+        now = version_obj.now
+        version_id = version_obj.version_id
+
         # Is there already a slot_id for this version?
-        old_slots = get_selected_slots(version_obj, frame_id, name,
-                                       slot_list_order, exc_on_ambiguity=False)
-        if old_slots:
-            old_slot = old_slots[0]
-            if old_slot['version_id'] == version_obj.version_id:
+        key = name.lower(), slot_list_order
+        if current_slots is None:
+            old_slot = get_one_selected_slot(version_obj, frame_id, name,
+                                             slot_list_order)
+        else:
+            old_slot = current_slots.get(key)
+        if old_slot is not None:
+            if old_slot['version_id'] == version_id:
                 # Yes, update existing slot_id
-                version_obj.update('Slot_version',
-                  dict(slot_id=old_slot['slot_id'],
-                       version_id=version_obj.version_id),
-                  description=description,
-                  value=str(value),
-                  updated_user=version_obj.user,
-                  updated_timestamp=version_obj.now)
+                update_slot_version(version_obj, old_slot['slot_id'],
+                                    description, db_value)
+                if current_slots is not None:
+                    current_slots[key] = dict(old_slot, value=db_value)
                 return
+
+            # No, bring the old slot_id forward into this version.
+            slot_id = old_slot['slot_id']
         else:
             if not forced:
                 raise AssertionError(
                         f"frame_id {frame_id}.{name}: "
                         "Can not change slot, doesn't already exist")
 
-        # slot_id already assigned?
-        try:
-            slot_id = version_obj.select_1_value("Slot", "slot_id",
-                                    frame_id=frame_id,
-                                    name=name,
-                                    slot_list_order=slot_list_order)
-        except AssertionError:
-            # No, create new Slot row...
-            version_obj.insert("Slot",
-                               frame_id=frame_id,
-                               name=name,
-                               slot_list_order=slot_list_order,
-                               creation_user=version_obj.user,
-                               creation_timestamp=version_obj.now)
-            slot_id = version_obj.lastrowid
+            # slot_id already assigned?
+            slot_id = get_slot_id(version_obj, frame_id, name,
+                                  slot_list_order, slot_ids)
+            if slot_id is None:
+                # No, create new Slot row...
+                version_obj.insert("Slot",
+                                   frame_id=frame_id,
+                                   name=name,
+                                   slot_list_order=slot_list_order,
+                                   creation_user=user,
+                                   creation_timestamp=now)
+                slot_id = version_obj.lastrowid
+                if slot_ids is not None:
+                    slot_ids[key] = slot_id
         version_obj.insert("Slot_version",
                            slot_id=slot_id,
-                           version_id=version_obj.version_id,
+                           version_id=version_id,
                            description=description,
                            value=db_value,
-                           creation_user=version_obj.user,
-                           creation_timestamp=version_obj.now)
+                           creation_user=user,
+                           creation_timestamp=now)
+        if current_slots is not None:
+            current_slots[key] = dict(slot_id=slot_id, version_id=version_id,
+                                      value=db_value)
     return
 
 
-def load_delete_slot(version_obj, frame_id, slot_name):
-    load_change_slot(version_obj, frame_id, slot_name, '<DELETED>', forced=True)
+def load_delete_slot(version_obj, frame_id, slot_name, current_slots=None,
+                     slot_ids=None):
+    load_change_slot(version_obj, frame_id, slot_name, '<DELETED>', forced=True,
+                     current_slots=current_slots, slot_ids=slot_ids)
 
 
-def load_delete_frames(version_obj, names):
-    version_obj.delete('Frame', name=names)
+def load_delete_frames(version_obj, names, chunk_size=500):
+    r'''Deletes all of the frames in `names`.
 
+    This is one "DELETE ... WHERE name IN (...)" for each `chunk_size` names,
+    to stay under the database's limit on the number of sql parameters.
+    '''
+    names = list(names)
+    for i in range(0, len(names), chunk_size):
+        version_obj.delete('Frame', name=names[i:i + chunk_size])
+    for name in names:
+        frame_id = version_obj.frame_names.pop(name.lower(), None)
+        if frame_id is not None:
+            version_obj.forget_frame(frame_id)
+    # The frame_ids of names that weren't looked up aren't known here.
+    version_obj.frame_labels.clear()
 
-def dump(conn, frame_id, full=False):
-    from versions import get_version_name
 
+def dump(conn, frame_id, full=False):
     if full:
         f = conn.select_1("Frame", frame_id=frame_id)
     else:
@@ -438,36 +1058,48 @@ def dump(conn, frame_id, full=False):
     print("Frame")
     for field in f.keys():
         print(f"  {field}:", f[field])
+    slot_fields = "slot_id,name,slot_list_order"
+    if full:
+        slot_fields += ",creation_user,creation_timestamp"
+    sv_fields = "version_id,value,description"
+    if full:
+        sv_fields += ",creation_user,creation_timestamp,"  \
+                      "updated_user,updated_timestamp"
+
+    # One SELECT for all of the Slots, with their Slot_versions and Version
+    # names.  The ORDER BY spells out the order that the Slot_index and
+    # Slot_version_index scans gave when these were separate SELECTs.
+    columns = ',\n       '.join(chain(
+                (f"s.{f} AS slot_{f}" for f in slot_fields.split(',')),
+                (f"sv.{f} AS sv_{f}" for f in sv_fields.split(',')),
+                ("v.name AS version_name",)))
     with conn.cursor() as cur:
-        slot_fields = "slot_id,name,slot_list_order"
-        if full:
-            slot_fields += ",creation_user,creation_timestamp"
-        sv_fields = "version_id,value,description"
-        if full:
-            sv_fields += ",creation_user,creation_timestamp,"  \
-                          "updated_user,updated_timestamp"
-        cur.select("Slot", slot_fields, frame_id=frame_id)
-        for slot in cur:
-            print()
-            print("Slot")
-            for f in slot_fields.split(','):
-                print(f"  {f}: {slot[f]}")
-            try:
-                conn.select("Slot_version", sv_fields, slot_id=slot['slot_id'])
-            except AssertionError:
-                print("  No Slot_versions")
-                pass
-            else:
+        cur.execute(f"SELECT {columns}",
+                    "  FROM Slot s",
+                    "       LEFT JOIN Slot_version sv USING (slot_id)",
+                    "       LEFT JOIN Version v",
+                    "         ON v.version_id = sv.version_id",
+                    " WHERE s.frame_id = :frame_id",
+                    " ORDER BY s.name, s.slot_list_order, s.slot_id,",
+                    "          sv.version_id",
+                    frame_id=frame_id)
+        last_slot_id = None
+        for row in cur:
+            if row['slot_slot_id'] != last_slot_id:
+                last_slot_id = row['slot_slot_id']
+                print()
+                print("Slot")
+                for f in slot_fields.split(','):
+                    print(f"  {f}: {row[f'slot_{f}']}")
                 print("  Slot_version")
-                for sv in conn:
-                    for f in sv_fields.split(','):
-                        if f == 'version_id':
-                            print(f"    {f}:",
-                                  f"{sv[f]} ({get_version_name(conn, sv[f])})")
-                        else:
-                            print(f"    {f}: {sv[f]}")
-                    print()
-
+            if row['sv_version_id'] is not None:
+                for f in sv_fields.split(','):
+                    if f == 'version_id':
+                        print(f"    {f}:", row['sv_version_id'],
+                              f"({row['version_name']})")
+                    else:
+                        print(f"    {f}: {row[f'sv_{f}']}")
+                print()
 
 
 if __name__ == "__main__":
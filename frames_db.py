@@ -30,13 +30,14 @@ def sqlite3_db():
 
         def __getitem__(self, name):
             assert isinstance(name, str)
-            try:
+            # extra_values is almost always empty, so check it rather than
+            # raising and catching a KeyError on every lookup.
+            if self.extra_values and name in self.extra_values:
                 return self.extra_values[name]
-            except KeyError:
-                try:
-                    return self.row[name]
-                except IndexError:
-                    raise KeyError(name)
+            try:
+                return self.row[name]
+            except IndexError:
+                raise KeyError(name)
 
         def get(self, name, default=None):
             try:
@@ -65,12 +66,26 @@ def sqlite3_db():
             raise NotImplemented
 
     class sqlite3_connection(db.connection):
+        # Take the write lock up front, so that a "with" block doing a bulk
+        # load is one transaction that can't fail part way through on a lock
+        # upgrade.
+        begin_sql = 'BEGIN IMMEDIATE'
+
         def __init__(self, *args, **kwargs):
             super().__init__(*args, **kwargs)
             self.db_conn.row_factory = Row
             self.reset_cursor()
             self.execute('PRAGMA foreign_keys = 1')
 
+            # With WAL, synchronous = NORMAL only syncs at checkpoints, rather
+            # than on every commit.
+            self.execute('PRAGMA journal_mode = WAL')
+            self.execute('PRAGMA synchronous = NORMAL')
+            self.execute('PRAGMA temp_store = MEMORY')
+
+            # 64MB page cache (negative means KiB, rather than pages).
+            self.execute('PRAGMA cache_size = -65536')
+
         def at_version(self, user, version_name, for_update=False):
             return version_obj(self, user, version_name, for_update)
 
@@ -2,9 +2,9 @@
 
 from yaml import load
 try:
-    from yaml import CLoader as Loader
+    from yaml import CSafeLoader as Loader
 except ImportError:
-    from yaml import Loader
+    from yaml import SafeLoader as Loader
 
 import versions
 import frames
@@ -56,9 +56,13 @@ if __name__ == "__main__":
         import os
         import frames_db
         if args.reset_db:
-            if os.path.exists(args.database):
-                print("Removing", args.database)
-                os.remove(args.database)
+            # The connection uses WAL, so a crashed run can leave -wal/-shm
+            # files that would be replayed into the new database.
+            for path in (args.database, args.database + '-wal',
+                         args.database + '-shm'):
+                if os.path.exists(path):
+                    print("Removing", path)
+                    os.remove(path)
         db_conn = frames_db.sqlite3_db().connect(args.database,
                                                  trace=args.db_trace)
         if args.reset_db:
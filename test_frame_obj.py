@@ -0,0 +1,15 @@
+# test_frame_obj.py
+
+import pytest
+
+
+def test_ako_loop(conn, load):
+    load('''
+        - frame_name: a
+          ako: $b
+        - frame_name: b
+          ako: $a
+        ''')
+    with conn.at_version('bruce', 'start') as version_obj:
+        with pytest.raises(AssertionError, match="Inheritance loop"):
+            version_obj.get_frame('a').missing
@@ -0,0 +1,107 @@
+# test_frames.py
+
+import pytest
+
+import frames
+
+
+def inherited_values(conn, frame_name, slot_name):
+    with conn.at_version('bruce', 'start') as version_obj:
+        frame_id = version_obj.get_frame_id(frame_name)
+        return [row['value']
+                for row in frames.get_inherited_slots(version_obj, frame_id,
+                                                      slot_name)]
+
+
+def test_ako_chain(conn, load):
+    load('''
+        - frame_name: a
+          x: [a1, a2]
+          y: a
+        - frame_name: b
+          ako: $a
+          x: {value: b1, slot_list_order: 1000}
+        - frame_name: c
+          ako: $b
+        ''')
+    assert inherited_values(conn, 'c', 'x') == ['b1', 'a2']
+    assert inherited_values(conn, 'c', 'y') == ['a']
+    assert inherited_values(conn, 'c', 'z') == []
+
+
+def test_ako_and_isa(conn, load):
+    load('''
+        - frame_name: base
+          x: base
+        - frame_name: kind
+          x: kind
+          y: kind
+        - frame_name: other_kind
+          z: other_kind
+        - frame_name: thing
+          ako: $base
+          isa: $kind
+          z: [thing]
+        - frame_name: item
+          isa: $thing
+        ''')
+    # ako comes before isa:
+    assert inherited_values(conn, 'thing', 'x') == ['base']
+    assert inherited_values(conn, 'thing', 'y') == ['kind']
+    # isa follows ako links on the frame it reaches, but not isa links:
+    assert inherited_values(conn, 'item', 'x') == ['base']
+    assert inherited_values(conn, 'item', 'y') == []
+    assert inherited_values(conn, 'item', 'z') == ['thing']
+
+
+def test_dangling_link_not_followed(conn, load):
+    load('''
+        - frame_name: a
+          isa: $nonexistent
+          x: a
+        ''')
+    assert inherited_values(conn, 'a', 'x') == ['a']
+
+
+def test_dangling_link_followed(conn, load):
+    load('''
+        - frame_name: a
+          isa: $nonexistent
+        ''')
+    with pytest.raises(NameError, match="'nonexistent' not found"):
+        inherited_values(conn, 'a', 'x')
+
+
+def test_inheritance_loop(conn, load):
+    load('''
+        - frame_name: a
+          ako: $b
+        - frame_name: b
+          ako: $c
+        - frame_name: c
+          ako: $a
+        ''')
+    with pytest.raises(AssertionError, match="Inheritance loop"):
+        inherited_values(conn, 'a', 'x')
+
+
+def test_self_loop(conn, load):
+    load('''
+        - frame_name: a
+          ako: $a
+        ''')
+    with pytest.raises(AssertionError, match="Inheritance loop"):
+        inherited_values(conn, 'a', 'x')
+
+
+def test_isa_back_to_self(conn, load):
+    # Not a loop, as isa is not followed again from b.
+    load('''
+        - frame_name: a
+          isa: $b
+          x: [a]
+        - frame_name: b
+          ako: $a
+          x: {value: b, slot_list_order: 1001}
+        ''')
+    assert inherited_values(conn, 'a', 'x') == ['a', 'b']
@@ -0,0 +1,42 @@
+# test_load_yaml.py
+
+import pytest
+
+import frames
+
+
+def test_reserved_slot_name_any_case(load):
+    with pytest.raises(ValueError, match="Illegal slot_name"):
+        load("- Frame_Name: other")
+
+
+def test_nested_list(load):
+    with pytest.raises(AssertionError, match="nested list"):
+        load("- lst: [a, [b, c]]")
+
+
+def test_readd_deleted_slot(conn, load):
+    load('''
+        - frame_name: a
+          x: 1
+        ''')
+    load('''
+        - a:
+          - delete: [x]
+          - add:
+              x: 2
+        ''', section='change')
+    with conn.at_version('bruce', 'start') as version_obj:
+        frame_id = version_obj.get_frame_id('a')
+        assert frames.get_one_selected_slot(version_obj, frame_id,
+                                            'x')['value'] == '2'
+
+
+def test_add_slot_checks(load):
+    load("- frame_name: a")
+    with pytest.raises(ValueError, match="Illegal slot_name"):
+        load("- a: [add: {Frame_Name: other}]", section='change')
+    with pytest.raises(AssertionError, match="nested list"):
+        load("- a: [add: {lst: [a, [b, c]]}]", section='change')
+    with pytest.raises(AssertionError, match="not legal in slot name"):
+        load("- frame_name: b\n  x[1]: y")
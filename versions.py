@@ -1,6 +1,6 @@
 # versions.py
 
-from frames import lookup_frame_id, get_selected_slots
+from frames import lookup_frame_id, lookup_frame_ids, get_selected_slots
 from frame_obj import frame
 
 
@@ -130,6 +130,13 @@ def load_delete_versions(conn, names):
 
 
 def dump(conn, name=None, full=False):
+    if full:
+        # {version_id: name} for all versions, rather than a get_version_name
+        # SELECT for each version_id printed.
+        conn.select("Version", "version_id, name")
+        version_names = {row['version_id']: row['name']
+                         for row in conn.fetchall()}
+
     def dump_row(row):
         print("Version")
         fields = "name,version_id,status,description"
@@ -146,24 +153,24 @@ def dump(conn, name=None, full=False):
                 cur.select("Version_requires", fields,
                            version_id=row['version_id'])
                 empty = True
-                for r in cur:
+                for r in cur.fetchall():
                     for f in fields.split(','):
                         v = r[f]
                         if f == 'required_version_id':
-                            v = f"{v} ({get_version_name(conn, v)})"
+                            v = f"{v} ({version_names[v]})"
                         print(f"  {f}: {v}")
                     print()
                     empty = False
                 if empty:
                     print()
                 print("Version_subsets", 
-                      sorted(get_version_name(conn, v) 
+                      sorted(version_names[v]
                              for v in cur.select_1_column("Version_subsets",
                                             "subset_id",
                                             superset_id=row['version_id'])))
                 print()
                 print("Version_supersets", 
-                      sorted(get_version_name(conn, v)
+                      sorted(version_names[v]
                              for v in cur.select_1_column("Version_subsets",
                                             "superset_id",
                                             subset_id=row['version_id'])))
@@ -171,7 +178,7 @@ def dump(conn, name=None, full=False):
     if name is None:
         print("name is None")
         conn.select("Version")
-        for row in conn:
+        for row in conn.fetchall():
             dump_row(row)
             print()
     else:
@@ -198,7 +205,9 @@ class version_obj:
         self.version_id = my_row['version_id']
         self.status = my_row['status']
         self.frame_cache = {}  # {id: frame}
-        self.frame_names = {}  # {frame_name.lower(): id}
+        self.pending_slots = None  # see frames.pending_slots
+        self.frame_names = {}  # {frame_name.lower(): id, or None if missing}
+        self.frame_labels = {}  # {id: frame_name, or None if it has none}
         if self.for_update:
             if self.status != 'proposed':
                 raise AssertionError(
@@ -218,7 +227,9 @@ class version_obj:
             del self.del_flag
         ans = self.db_conn.__exit__(exc_type, exc_val, exc_tb)
         del self.frame_cache
+        del self.pending_slots
         del self.frame_names
+        del self.frame_labels
         del self.version_id
         del self.status
 
@@ -258,8 +269,31 @@ class version_obj:
             try:
                 self.frame_names[fn_lower] = lookup_frame_id(self, frame_name)
             except AssertionError:
-                raise NameError(f"Frame {frame_name!r} not found") from None
-        return self.frame_names[fn_lower]
+                self.frame_names[fn_lower] = None
+        frame_id = self.frame_names[fn_lower]
+        if frame_id is None:
+            raise NameError(f"Frame {frame_name!r} not found")
+        return frame_id
+
+    def lookup_ids(self, frame_labels):
+        r'''Looks up the frame_ids for all `frame_labels` with one SELECT.
+
+        This just primes the cache used by `lookup_id`.  Frame_ids, and
+        frame_names already looked up, are skipped.  Frame_names that are not
+        found are cached as missing, so `lookup_id` raises NameError for them
+        without another SELECT.
+        '''
+        names = set()
+        for frame_label in frame_labels:
+            if isinstance(frame_label, str):
+                if frame_label[0] == '$':
+                    frame_label = frame_label[1:]
+                if not frame_label.isdigit() and \
+                   frame_label.lower() not in self.frame_names:
+                    names.add(frame_label)
+        found = lookup_frame_ids(self, names)
+        for name in names:
+            self.frame_names[name.lower()] = found.get(name.lower())
 
     def get_frame(self, frame_label):
         frame_id = self.get_frame_id(frame_label)
@@ -267,6 +301,14 @@ class version_obj:
             self.frame_cache[frame_id] = self.read_frame(frame_id)
         return self.frame_cache[frame_id]
 
+    def forget_frame(self, frame_id):
+        r'''Drops everything cached for `frame_id`.
+
+        Must be called when `frame_id` is written to.
+        '''
+        self.frame_cache.pop(frame_id, None)
+        self.frame_labels.pop(frame_id, None)
+
     def read_frame(self, frame_id):
         r'''Returns a list of Frame_slot rows.
 
@@ -280,10 +322,14 @@ class version_obj:
 
         Returns None if frame_id has no frame_name.
         '''
+        if frame_id in self.frame_labels:
+            return self.frame_labels[frame_id]
         try:
-            return self.select_1_value('Frame', 'name', frame_id=frame_id)
+            ans = self.select_1_value('Frame', 'name', frame_id=frame_id)
         except AssertionError:
-            return None
+            ans = None
+        self.frame_labels[frame_id] = ans
+        return ans
 
 
 